@@ -1,7 +1,34 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from string import ascii_letters
 
+# Relative frequency (%) of each letter in English text
+ENGLISH_LETTER_FREQUENCIES = {
+    "a": 8.167, "b": 1.492, "c": 2.782, "d": 4.253, "e": 12.702,
+    "f": 2.228, "g": 2.015, "h": 6.094, "i": 6.966, "j": 0.153,
+    "k": 0.772, "l": 4.025, "m": 2.406, "n": 6.749, "o": 7.507,
+    "p": 1.929, "q": 0.095, "r": 5.987, "s": 6.327, "t": 9.056,
+    "u": 2.758, "v": 0.978, "w": 2.360, "x": 0.150, "y": 1.974,
+    "z": 0.074,
+}
+
+
+@lru_cache(maxsize=256)
+def translation_table(alphabet: str, key: int) -> dict[int, str]:
+    """
+    The str.translate table that shifts every character of alphabet by key,
+    cached per (alphabet, key). A character repeated in the alphabet is
+    shifted from its first occurrence, as with alphabet.index.
+    >>> "abz".translate(translation_table("abcdefghijklmnopqrstuvwxyz", 1))
+    'bca'
+    """
+    table: dict[int, str] = {}
+    for index, character in enumerate(alphabet):
+        table.setdefault(ord(character),
+                         alphabet[(index + key) % len(alphabet)])
+    return table
+
 
 def encrypt(input_string: str, key: int, alphabet: str | None = None) -> str:
     """
@@ -49,21 +76,12 @@ def encrypt(input_string: str, key: int, alphabet: str | None = None) -> str:
     # Set default alphabet to lower and upper case english chars
     alpha = alphabet or ascii_letters
 
-    # The final result string
-    result = ""
-
-    for character in input_string:
-        if character not in alpha:
-            # Append without encryption if character is not in the alphabet
-            result += character
-        else:
-            # Get the index of the new key and make sure it isn't too large
-            new_key = (alpha.index(character) + key) % len(alpha)
-
-            # Append the encoded character to the alphabet
-            result += alpha[new_key]
+    # Any iterable of characters is accepted, as with the per-character loop
+    if not isinstance(input_string, str):
+        input_string = "".join(iter(input_string))
 
-    return result
+    # Characters outside the alphabet have no entry and are kept as they are
+    return input_string.translate(translation_table(alpha, key % len(alpha)))
 
 
 def decrypt(input_string: str, key: int, alphabet: str | None = None) -> str:
@@ -170,16 +188,92 @@ def brute_force(input_string: str,
     return brute_force_data
 
 
+def _histogram(input_string: str, alphabet: str) -> list[int]:
+    # Occurrences of each alphabet position in input_string
+    first_index: dict[str, int] = {}
+    for index, character in enumerate(alphabet):
+        first_index.setdefault(character, index)
+    counts = [0] * len(alphabet)
+    for character in input_string:
+        if character in first_index:
+            counts[first_index[character]] += 1
+    return counts
+
+
+def chi_squared_scores(input_string: str,
+                       alphabet: str | None = None) -> dict[int, float]:
+    """
+    Scores every key that brute_force tries by how far the letter
+    frequencies of the decrypted text are from English (chi-squared; lower
+    is better). The cipher-text is counted once; the decrypted text is never
+    built, each key just moves the counts to other letters.
+    >>> scores = chi_squared_scores("Jgnnq, ecrvckp")
+    >>> len(scores), min(scores, key=scores.get)
+    (52, 2)
+    """
+    # Set default alphabet to lower and upper case english chars
+    alpha = alphabet or ascii_letters
+    return _chi_squared(_histogram(input_string, alpha), alpha)
+
+
+def _chi_squared(counts: list[int], alphabet: str) -> dict[int, float]:
+    size = len(alphabet)
+    total = sum(counts)
+
+    # Letter that each alphabet position decrypts to under key 0
+    letters = [character.lower() for character in alphabet]
+    expected = {letter: total * frequency / 100
+                for letter, frequency in ENGLISH_LETTER_FREQUENCIES.items()}
+
+    scores = {}
+    for key in range(1, size + 1):
+        observed = dict.fromkeys(expected, 0)
+        for index, count in enumerate(counts):
+            if count:
+                letter = letters[(index - key) % size]
+                if letter in observed:
+                    observed[letter] += count
+        scores[key] = sum((observed[letter] - expected[letter]) ** 2
+                          / expected[letter]
+                          for letter in expected) if total else 0.0
+    return scores
+
+
+def brute_force_best(input_string: str, alphabet: str | None = None,
+                     top: int = 1) -> list[int]:
+    """
+    The top keys most likely to decrypt input_string into English, best
+    first, ranked by chi_squared_scores. Keys that only differ in letter
+    case score the same; the one giving fewer upper case letters wins.
+    >>> brute_force_best("jFyuMy xIH'N vLONy zILwy Gy!")
+    [20]
+    >>> key = brute_force_best(encrypt("Meet me near the old bridge", 33))[0]
+    >>> decrypt(encrypt("Meet me near the old bridge", 33), key)
+    'Meet me near the old bridge'
+    """
+    alpha = alphabet or ascii_letters
+    counts = _histogram(input_string, alpha)
+    scores = _chi_squared(counts, alpha)
+
+    def upper_case_count(key: int) -> int:
+        return sum(count for index, count in enumerate(counts)
+                   if alpha[(index - key) % len(alpha)].isupper())
+
+    return sorted(scores, key=lambda key: (scores[key],
+                                           upper_case_count(key)))[:top]
+
+
 if __name__ == "__main__":
     while True:
         print(f'\n{"-" * 10}\n Menu\n{"-" * 10}')
-        print(*["1.Encrypt", "2.Decrypt", "3.BruteForce", "4.Quit"], sep="\n")
+        print(*["1.Encrypt", "2.Decrypt", "3.BruteForce", "4.Quit",
+                "5.BestKey"], sep="\n")
 
         # get user input
         choice = input("\nWhat would you like to do?: ").strip() or "4"
 
         # run functions based on what the user chose
-        if choice not in ("1", "2", "3", "4"):
+        if choice not in ("1", "2", "3", "4", "5"):
             print("Invalid choice, please enter a valid choice")
         elif choice == "1":
             input_string = input("Please enter the string to be encrypted: ")
@@ -198,6 +292,12 @@ if __name__ == "__main__":
             for key, value in brute_force_data.items():
                 print(f"Key: {key} | Message: {value}")
 
+        elif choice == "5":
+            input_string = input("Please enter the string to be decrypted: ")
+            key = brute_force_best(input_string)[0]
+
+            print(f"Key: {key} | Message: {decrypt(input_string, key)}")
+
         elif choice == "4":
             print("Goodbye.")
             break
@@ -5,13 +5,19 @@ Reference: https://en.wikipedia.org/wiki/Enigma_machine
 
 Module includes:
 - enigma function
+- EnigmaMachine class, a precompiled machine for long inputs
+- find_rotor_settings, a crib-based search for the rotor settings
 - showcase of function usage
 - 9 randomly generated rotors
 - reflector (aka static rotor)
 - original alphabet
 """
 from __future__ import annotations
+import heapq
+import re
 import string
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate, permutations
 
 RotorPositionT = tuple[int, int, int]
 RotorSelectionT = tuple[str, str, str]
@@ -71,6 +77,7 @@ def _validator(
     ((1, 1, 1), ('EGZWVONAHDCLFQMSIPJBYUKXTR', 'FOBHMDKEXQNRAULPGSJVTYICZW', \
 'ZJXESIUQLHAVRMDOYGTNFWPBKC'), \
 {'P': 'O', 'O': 'P', 'L': 'A', 'A': 'L', 'N': 'D', 'D': 'N'})
+
     :param rotpos: rotor_positon
     :param rotsel: rotor_selection
     :param pb: plugb -> validated and transformed
@@ -111,6 +118,7 @@ def _plugboard(pbstring: str) -> dict[str, str]:
     {'P': 'I', 'I': 'P', 'C': 'T', 'T': 'C', 'U': 'R', 'R': 'U', 'E': 'S', 'S': 'E'}
     >>> _plugboard('POLAND')
     {'P': 'O', 'O': 'P', 'L': 'A', 'A': 'L', 'N': 'D', 'D': 'N'}
+
     In the code, 'pb' stands for 'plugboard'
     Pairs can be separated by spaces
     :param pbstring: string containing plugboard setting for the Enigma machine
@@ -188,6 +196,7 @@ def enigma(
     'FPNCZ QWOBU!'
     >>> enigma('FPNCZ QWOBU', (1, 1, 1), plugb='pictures')
     'HELLO WORLD'
+
     :param text: input message
     :param rotor_position: tuple with 3 values in range 1..26
     :param rotor_selection: tuple with 3 rotors ()
@@ -262,6 +271,267 @@ def enigma(
     return "".join(result)
 
 
+ABC_BYTES = abc.encode("ascii")
+# Number of distinct rotor states; the states repeat with this period
+ROTOR_STATES = len(abc) ** 3
+REFLECTOR_TABLE = bytes.maketrans(
+    ABC_BYTES, "".join(reflector[symbol] for symbol in abc).encode("ascii")
+)
+
+
+class EnigmaMachine:
+    """
+    Enigma machine with the settings validated and compiled once,
+    producing the same output as the enigma function.
+    For every rotor and every offset a forward and an inverse
+    translation table is built up front. The whole path of a letter
+    through the plugboard, rotors and reflector for one rotor state is
+    composed from these into a single bytes.translate table, computed
+    the first time that state is needed and cached. Letter k of a
+    message is always encrypted in rotor state (start + k) mod 26**3, so
+    all letters sharing a state are translated in one slice operation.
+    >>> machine = EnigmaMachine((1, 2, 1), plugb='pictures')
+    >>> machine.encrypt('Hello World!')
+    'KORYH JUHHI!'
+    >>> machine.encrypt(b'KORYH, juhhi!')
+    b'HELLO, WORLD!'
+    >>> text = 'The quick brown fox jumps over the lazy dog. ' * 50
+    >>> machine.encrypt(text) == enigma(text, (1, 2, 1), plugb='pictures')
+    True
+    >>> EnigmaMachine((1, 1, 1), (rotor1, rotor1, rotor2))
+    Traceback (most recent call last):
+    ...
+    Exception: Please use 3 unique rotors (not 2)
+    """
+
+    def __init__(
+        self,
+        rotor_position: RotorPositionT,
+        rotor_selection: RotorSelectionT = (rotor1, rotor2, rotor3),
+        plugb: str = "",
+    ) -> None:
+        rotor_position, rotor_selection, plugboard = _validator(
+            rotor_position, rotor_selection, plugb.upper()
+        )
+        self.rotor_position = rotor_position
+        self.rotor_selection = rotor_selection
+        self.plugboard = plugboard
+
+        size = len(abc)
+        self._plugboard_table = bytes.maketrans(
+            "".join(plugboard).encode("ascii"),
+            "".join(plugboard.values()).encode("ascii"),
+        )
+        self._forward = []
+        self._inverse = []
+        for rotor in rotor_selection:
+            encoded = rotor.encode("ascii")
+            self._forward.append([
+                bytes.maketrans(ABC_BYTES,
+                                bytes(encoded[(i + offset) % size]
+                                      for i in range(size)))
+                for offset in range(size)
+            ])
+            self._inverse.append([
+                bytes.maketrans(encoded,
+                                bytes(ABC_BYTES[(i - offset) % size]
+                                      for i in range(size)))
+                for offset in range(size)
+            ])
+        rotorpos1, rotorpos2, rotorpos3 = rotor_position
+        self._start = (rotorpos1 - 1) + size * (rotorpos2 - 1) \
+            + size * size * (rotorpos3 - 1)
+        self._tables: list[bytes | None] = [None] * ROTOR_STATES
+
+    def _state_table(self, state: int) -> bytes:
+        """Translation table of the whole machine for one rotor state."""
+        table = self._tables[state]
+        if table is None:
+            size = len(abc)
+            offset1 = state % size
+            offset2 = state // size % size
+            offset3 = state // (size * size)
+            row = (
+                ABC_BYTES.translate(self._plugboard_table)
+                .translate(self._forward[0][offset1])
+                .translate(self._forward[1][offset2])
+                .translate(self._forward[2][offset3])
+                .translate(REFLECTOR_TABLE)
+                .translate(self._inverse[2][offset3])
+                .translate(self._inverse[1][offset2])
+                .translate(self._inverse[0][offset1])
+                .translate(self._plugboard_table)
+            )
+            table = self._tables[state] = bytes.maketrans(ABC_BYTES, row)
+        return table
+
+    def _encrypt_letters(self, letters: bytes) -> bytes:
+        """Encrypts a string made only of the bytes A..Z."""
+        result = bytearray(letters)
+        start = self._start
+        for k in range(min(len(letters), ROTOR_STATES)):
+            table = self._state_table((start + k) % ROTOR_STATES)
+            result[k::ROTOR_STATES] = letters[k::ROTOR_STATES].translate(table)
+        return bytes(result)
+
+    def encrypt(self, text: str | bytes) -> str | bytes:
+        """
+        Encrypts or decrypts text starting from the machine's rotor
+        position. Like enigma, the text is converted to uppercase and
+        symbols other than A..Z are passed through without moving the
+        rotors. bytes in give bytes out.
+        """
+        if isinstance(text, str):
+            pieces = re.split("([A-Z]+)", text.upper())
+            runs = pieces[1::2]
+            crypted = self._encrypt_letters(
+                "".join(runs).encode("ascii")).decode("ascii")
+        else:
+            pieces = re.split(b"([A-Z]+)", bytes(text).upper())
+            runs = pieces[1::2]
+            crypted = self._encrypt_letters(b"".join(runs))
+        # put the encrypted letters back between the untouched symbols
+        ends = list(accumulate(map(len, runs)))
+        pieces[1::2] = map(crypted.__getitem__,
+                           map(slice, [0, *ends[:-1]], ends))
+        return pieces[0][:0].join(pieces)
+
+    decrypt = encrypt
+
+
+def _state_position(state: int) -> RotorPositionT:
+    """Rotor position tuple (1..26 each) of a rotor state index.
+    >>> _state_position(0), _state_position(27), _state_position(17575)
+    ((1, 1, 1), (2, 2, 1), (26, 26, 26))
+    """
+    size = len(abc)
+    return (state % size + 1, state // size % size + 1,
+            state // (size * size) + 1)
+
+
+def _search_states(
+    cipher_letters: bytes,
+    crib_letters: bytes,
+    rotor_selection: RotorSelectionT,
+    plugb: str,
+    first_state: int,
+    last_state: int,
+    max_mismatches: int,
+    top_k: int,
+) -> list[tuple[int, int]]:
+    """Scores the start states first_state..last_state - 1 of one rotor
+    order against the crib and returns the top_k (score, state) pairs.
+    A candidate is dropped as soon as it has more than max_mismatches
+    wrong letters, which for a wrong setting is usually the first letter.
+    """
+    machine = EnigmaMachine((1, 1, 1), rotor_selection, plugb)
+    # tables are built on first use, so only the states this chunk
+    # actually reaches are compiled
+    tables = machine._tables
+    state_table = machine._state_table
+    pairs = list(zip(cipher_letters, crib_letters))
+    found = []
+    for state in range(first_state, last_state):
+        mismatches = 0
+        for step, (cipher, plain) in enumerate(pairs):
+            current = (state + step) % ROTOR_STATES
+            table = tables[current] or state_table(current)
+            if table[cipher] != plain:
+                mismatches += 1
+                if mismatches > max_mismatches:
+                    break
+        else:
+            found.append((len(pairs) - mismatches, state))
+    return heapq.nlargest(top_k, found, key=lambda item: (item[0], -item[1]))
+
+
+def find_rotor_settings(
+    ciphertext: str,
+    crib: str,
+    rotors: tuple[str, ...] = (rotor1, rotor2, rotor3),
+    plugb: str = "",
+    crib_offset: int = 0,
+    max_mismatches: int = 0,
+    top_k: int = 5,
+    processes: int | None = None,
+) -> list[tuple[int, RotorPositionT, RotorSelectionT]]:
+    """
+    Recovers rotor orders and start positions from a known plaintext crib.
+    Every ordering of 3 of the given rotors is tried with every one of the
+    26**3 start positions. The crib is compared letter by letter with the
+    decryption of the ciphertext letters starting at crib_offset (counted
+    in letters, since other symbols do not move the rotors), and a
+    candidate is abandoned once it has more than max_mismatches wrong
+    letters. With processes > 1 the position space of every rotor order
+    is split into chunks that are searched in a process pool.
+    Returns up to top_k (score, rotor_position, rotor_selection) tuples,
+    best first, where the score is the number of matching crib letters.
+    >>> secret = enigma('Attack at dawn, hold the bridge', (5, 17, 2),
+    ...                 (rotor2, rotor1, rotor3), 'pictures')
+    >>> best = find_rotor_settings(secret, 'attack at dawn',
+    ...                            plugb='pictures')
+    >>> best[0] == (12, (5, 17, 2), (rotor2, rotor1, rotor3))
+    True
+    >>> secret = enigma('Attack at dawn, hold the bridge', (20, 3, 9),
+    ...                 (rotor2, rotor1, rotor3))
+    >>> _, position, selection = find_rotor_settings(
+    ...     secret, 'hold the bridge', crib_offset=12)[0]
+    >>> position, enigma(secret, position, selection)
+    ((20, 3, 9), 'ATTACK AT DAWN, HOLD THE BRIDGE')
+    >>> find_rotor_settings(secret, '123')
+    Traceback (most recent call last):
+    ...
+    ValueError: The crib has no letters to compare
+    """
+    cipher_letters = re.sub("[^A-Z]", "", ciphertext.upper()).encode("ascii")
+    crib_letters = re.sub("[^A-Z]", "", crib.upper()).encode("ascii")
+    if not crib_letters:
+        raise ValueError("The crib has no letters to compare")
+    cipher_letters = cipher_letters[crib_offset:
+                                    crib_offset + len(crib_letters)]
+    if len(cipher_letters) < len(crib_letters):
+        raise ValueError("The ciphertext is shorter than the crib")
+
+    orders = list(permutations(rotors, 3))
+    serial = processes is None or processes <= 1
+    chunks = 1 if serial else processes
+    bounds = [ROTOR_STATES * i // chunks for i in range(chunks + 1)]
+    tasks = [
+        (order_index, bounds[i], bounds[i + 1])
+        for order_index in range(len(orders))
+        for i in range(chunks)
+    ]
+    order_indexes, first_states, last_states = zip(*tasks)
+    count = len(tasks)
+    task_args = (
+        [cipher_letters] * count,
+        [crib_letters] * count,
+        [orders[order_index] for order_index in order_indexes],
+        [plugb] * count,
+        first_states,
+        last_states,
+        [max_mismatches] * count,
+        [top_k] * count,
+    )
+    if serial:
+        results = map(_search_states, *task_args)
+    else:
+        with ProcessPoolExecutor(processes) as executor:
+            results = list(executor.map(_search_states, *task_args))
+
+    candidates = [
+        (score, order_index, state)
+        for (order_index, _, _), found in zip(tasks, results)
+        for score, state in found
+    ]
+    best = heapq.nlargest(top_k, candidates,
+                          key=lambda item: (item[0], -item[1], -item[2]))
+    # the states were scored at the crib; report the message key
+    return [(score, _state_position((state - crib_offset) % ROTOR_STATES),
+             orders[order_index])
+            for score, order_index, state in best]
+
+
 if __name__ == "__main__":
     import doctest
 
@@ -1,8 +1,49 @@
 # Primality Testing with the Rabin-Miller Algorithm
+import math
 import random
+from collections.abc import Iterable
 
+# (bound, witnesses), sorted by bound: Miller-Rabin with these bases is
+# exact for every n < bound. The last entry, the first 13 primes, covers
+# n < 3.3 * 10**24. The bases for n < 2**64 are Jim Sinclair's set of
+# seven, which also replaces the nine-prime set for n < 3825123056546413051.
+DETERMINISTIC_WITNESSES = (
+    (2047, (2,)),
+    (1373653, (2, 3)),
+    (25326001, (2, 3, 5)),
+    (3215031751, (2, 3, 5, 7)),
+    (2152302898747, (2, 3, 5, 7, 11)),
+    (3474749660383, (2, 3, 5, 7, 11, 13)),
+    (341550071728321, (2, 3, 5, 7, 11, 13, 17)),
+    (2**64, (2, 325, 9375, 28178, 450775, 9780504, 1795265022)),
+    (318665857834031151167461, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)),
+    (3317044064679887385961981,
+     (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)),
+)
 
-def rabin_miller(num: int) -> bool:
+
+def _is_strong_probable_prime(num: int, s: int, t: int, a: int) -> bool:
+    # num - 1 == s * 2**t with s odd
+    v = pow(a, s, num)
+    if v in (1, num - 1):
+        return True
+    for _ in range(t - 1):
+        v = pow(v, 2, num)
+        if v == num - 1:
+            return True
+    return False
+
+
+def rabin_miller(num: int, rounds: int = 5) -> bool:
+    """
+    Miller-Rabin test for an odd num > 3. Below 3.3 * 10**24 it uses the
+    fixed witnesses of DETERMINISTIC_WITNESSES and is exact; above that it
+    runs rounds rounds with random witnesses.
+    >>> rabin_miller(3215031751)  # strong pseudoprime to bases 2, 3, 5, 7
+    False
+    >>> rabin_miller(2**89 - 1)
+    True
+    """
     s = num - 1
     t = 0
 
@@ -10,210 +51,229 @@ def rabin_miller(num: int) -> bool:
         s = s // 2
         t += 1
 
-    for _ in range(5):
+    for bound, witnesses in DETERMINISTIC_WITNESSES:
+        if num < bound:
+            # a base divisible by num says nothing and is skipped
+            return all(_is_strong_probable_prime(num, s, t, a % num)
+                       for a in witnesses if a % num)
+
+    for _ in range(rounds):
         a = random.randrange(2, num - 1)
-        v = pow(a, s, num)
-        if v != 1:
-            i = 0
-            while v != (num - 1):
-                if i == t - 1:
-                    return False
-                else:
-                    i = i + 1
-                    v = (v**2) % num
+        if not _is_strong_probable_prime(num, s, t, a):
+            return False
     return True
 
 
-def is_prime_low_num(num: int) -> bool:
+def sieve_primes(limit: int) -> list[int]:
+    """
+    Primes below limit (sieve of Eratosthenes).
+    >>> sieve_primes(30)
+    [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
+    """
+    sieve = bytearray([1]) * max(limit, 2)
+    sieve[0] = sieve[1] = 0
+    for i in range(2, int(limit**0.5) + 1):
+        if sieve[i]:
+            sieve[i * i:: i] = bytes(len(range(i * i, limit, i)))
+    return [i for i, is_prime in enumerate(sieve) if is_prime]
+
+
+# Trial divisors of is_prime_low_num
+LOW_PRIMES = tuple(sieve_primes(1000))
+LOW_PRIME_SET = frozenset(LOW_PRIMES)
+LOW_PRIMORIAL = math.prod(LOW_PRIMES)
+
+# Odd primes used to clear composites out of candidate windows, and the
+# number of odd candidates per window
+SIEVE_PRIMES = tuple(sieve_primes(1 << 16)[1:])
+WINDOW_SIZE = 1 << 12
+
+
+def _small_prime_filter(num: int) -> bool | None:
+    # True or False when the low primes decide num, None otherwise
     if num < 2:
         return False
-
-    low_primes = [
-        2,
-        3,
-        5,
-        7,
-        11,
-        13,
-        17,
-        19,
-        23,
-        29,
-        31,
-        37,
-        41,
-        43,
-        47,
-        53,
-        59,
-        61,
-        67,
-        71,
-        73,
-        79,
-        83,
-        89,
-        97,
-        101,
-        103,
-        107,
-        109,
-        113,
-        127,
-        131,
-        137,
-        139,
-        149,
-        151,
-        157,
-        163,
-        167,
-        173,
-        179,
-        181,
-        191,
-        193,
-        197,
-        199,
-        211,
-        223,
-        227,
-        229,
-        233,
-        239,
-        241,
-        251,
-        257,
-        263,
-        269,
-        271,
-        277,
-        281,
-        283,
-        293,
-        307,
-        311,
-        313,
-        317,
-        331,
-        337,
-        347,
-        349,
-        353,
-        359,
-        367,
-        373,
-        379,
-        383,
-        389,
-        397,
-        401,
-        409,
-        419,
-        421,
-        431,
-        433,
-        439,
-        443,
-        449,
-        457,
-        461,
-        463,
-        467,
-        479,
-        487,
-        491,
-        499,
-        503,
-        509,
-        521,
-        523,
-        541,
-        547,
-        557,
-        563,
-        569,
-        571,
-        577,
-        587,
-        593,
-        599,
-        601,
-        607,
-        613,
-        617,
-        619,
-        631,
-        641,
-        643,
-        647,
-        653,
-        659,
-        661,
-        673,
-        677,
-        683,
-        691,
-        701,
-        709,
-        719,
-        727,
-        733,
-        739,
-        743,
-        751,
-        757,
-        761,
-        769,
-        773,
-        787,
-        797,
-        809,
-        811,
-        821,
-        823,
-        827,
-        829,
-        839,
-        853,
-        857,
-        859,
-        863,
-        877,
-        881,
-        883,
-        887,
-        907,
-        911,
-        919,
-        929,
-        937,
-        941,
-        947,
-        953,
-        967,
-        971,
-        977,
-        983,
-        991,
-        997,
-    ]
-
-    if num in low_primes:
+    if num in LOW_PRIME_SET:
         return True
+    if math.gcd(num, LOW_PRIMORIAL) != 1:
+        return False
+    if num < LOW_PRIMES[-1] ** 2:
+        return True
+    return None
+
+
+def is_prime_low_num(
+    num: int, rounds: int = 5, baillie_psw: bool = False
+) -> bool:
+    """
+    Trial division by LOW_PRIMES, then Miller-Rabin (or Baillie-PSW).
+    >>> [n for n in range(30) if is_prime_low_num(n)]
+    [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
+    >>> is_prime_low_num(997 * 1009)
+    False
+    >>> is_prime_low_num(2**127 - 1, baillie_psw=True)
+    True
+    """
+    known = _small_prime_filter(num)
+    if known is not None:
+        return known
+    if baillie_psw:
+        return is_baillie_psw_prime(num)
+    return rabin_miller(num, rounds)
+
+
+def jacobi_symbol(a: int, n: int) -> int:
+    """
+    Jacobi symbol (a/n) for odd positive n.
+    >>> [jacobi_symbol(a, 7) for a in range(7)]
+    [0, 1, 1, -1, 1, -1, -1]
+    """
+    a %= n
+    result = 1
+    while a:
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
+
 
-    for prime in low_primes:
-        if (num % prime) == 0:
+def _is_strong_lucas_probable_prime(num: int) -> bool:
+    # Selfridge's method A: the first D of 5, -7, 9, -11, ... with
+    # (D/num) == -1, P = 1, Q = (1 - D) / 4
+    if math.isqrt(num) ** 2 == num:
+        return False
+    d = 5
+    while (jacobi := jacobi_symbol(d, num)) != -1:
+        if jacobi == 0 and abs(d) != num:
             return False
+        d = -d - 2 if d > 0 else -d + 2
+    q = (1 - d) // 4
+
+    s = num + 1
+    t = 0
+    while s % 2 == 0:
+        s //= 2
+        t += 1
+
+    def halve(x: int) -> int:
+        x %= num
+        return (x + num if x & 1 else x) // 2
+
+    # U_k, V_k and Q**k for k = 1, extended bit by bit up to k = s
+    u, v, q_k = 1, 1, q % num
+    for bit in bin(s)[3:]:
+        u, v = u * v % num, (v * v - 2 * q_k) % num
+        q_k = q_k * q_k % num
+        if bit == "1":
+            u, v = halve(u + v), halve(d * u + v)
+            q_k = q_k * q % num
+    if u == 0 or v == 0:
+        return True
+    for _ in range(t - 1):
+        v = (v * v - 2 * q_k) % num
+        if v == 0:
+            return True
+        q_k = q_k * q_k % num
+    return False
+
 
-    return rabin_miller(num)
+def is_baillie_psw_prime(num: int) -> bool:
+    """
+    Baillie-PSW test: a base-2 strong probable prime test followed by a
+    strong Lucas test. No composite is known to pass it.
+    >>> is_baillie_psw_prime(3215031751)
+    False
+    >>> is_baillie_psw_prime(2**89 - 1)
+    True
+    >>> is_baillie_psw_prime(5777)  # strong Lucas pseudoprime, fails base 2
+    False
+    """
+    known = _small_prime_filter(num)
+    if known is not None:
+        return known
+    s = num - 1
+    t = 0
+    while s % 2 == 0:
+        s //= 2
+        t += 1
+    return (_is_strong_probable_prime(num, s, t, 2)
+            and _is_strong_lucas_probable_prime(num))
+
+
+def are_prime(
+    numbers: Iterable[int], rounds: int = 5, baillie_psw: bool = False
+) -> list[bool]:
+    """
+    is_prime_low_num for many numbers. Most composites are rejected by a
+    single gcd with the product of LOW_PRIMES before any modular
+    exponentiation.
+    >>> are_prime([1, 2, 91, 97, 561, 2**61 - 1])
+    [False, True, False, True, False, True]
+    """
+    return [is_prime_low_num(num, rounds, baillie_psw) for num in numbers]
+
+
+def prime_candidates(
+    start: int,
+    window: int = WINDOW_SIZE,
+    primes: tuple[int, ...] = SIEVE_PRIMES,
+):
+    """
+    Yields the odd numbers from start upwards that have no factor among
+    primes (other than themselves). Every window of odd numbers is sieved
+    at once: one modular reduction per prime finds its first multiple and
+    a slice assignment clears the rest.
+    >>> from itertools import islice
+    >>> list(islice(prime_candidates(90, window=8, primes=(3, 5, 7)), 6))
+    [97, 101, 103, 107, 109, 113]
+    >>> list(islice(prime_candidates(2, window=4, primes=(3, 5)), 5))
+    [3, 5, 7, 11, 13]
+    """
+    start |= 1
+    while True:
+        sieve = bytearray([1]) * window
+        for prime in primes:
+            # index of the first odd multiple of prime that is >= start
+            first = (-start % prime) * ((prime + 1) // 2) % prime
+            if start + 2 * first == prime:
+                first += prime
+            sieve[first::prime] = bytes(len(range(first, window, prime)))
+        for i in range(window):
+            if sieve[i]:
+                yield start + 2 * i
+        start += 2 * window
 
 
-def generate_large_prime(keysize: int = 1024) -> int:
+def generate_large_prime(keysize: int = 1024, stop=None) -> int | None:
+    """
+    Random prime of exactly keysize bits. Candidates come from
+    prime_candidates, so Miller-Rabin only runs on numbers without small
+    factors. stop is an optional threading or multiprocessing Event that
+    is checked before every candidate; the search returns None once it
+    is set.
+    >>> prime = generate_large_prime(64)
+    >>> prime.bit_length(), is_prime_low_num(prime)
+    (64, True)
+    >>> import threading
+    >>> stop = threading.Event()
+    >>> stop.set()
+    >>> print(generate_large_prime(64, stop))
+    None
+    """
     while True:
-        num = random.randrange(2 ** (keysize - 1), 2 ** (keysize))
-        if is_prime_low_num(num):
-            return num
+        start = random.randrange(2 ** (keysize - 1), 2 ** (keysize))
+        for num in prime_candidates(start):
+            if stop is not None and stop.is_set():
+                return None
+            if num >= 2**keysize:
+                break
+            if num in LOW_PRIME_SET or rabin_miller(num):
+                return num
 
 
 if __name__ == "__main__":
@@ -1,24 +1,47 @@
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from . import rsa_key_generator as rkg
 
 DEFAULT_BLOCK_SIZE = 128
 BYTE_SIZE = 256
+# Blocks encrypted or decrypted per read when streaming files
+STREAM_BLOCKS = 256
 
 
 def get_blocks_from_text(
-    message: str, block_size: int = DEFAULT_BLOCK_SIZE
+    message: str | bytes, block_size: int = DEFAULT_BLOCK_SIZE
 ) -> list[int]:
-    message_bytes = message.encode("ascii")
-
-    block_ints = []
-    for block_start in range(0, len(message_bytes), block_size):
-        block_int = 0
-        for i in range(block_start,
-                       min(block_start + block_size, len(message_bytes))):
-            block_int += message_bytes[i] * (BYTE_SIZE ** (i % block_size))
-        block_ints.append(block_int)
-    return block_ints
+    """
+    Packs every block_size bytes of the message into one integer, the first
+    byte being the least significant. str messages are encoded as UTF-8.
+    >>> get_blocks_from_text("Hello!", 4)
+    [1819043144, 8559]
+    >>> get_blocks_from_text(b"\\xff\\x00\\x01", 2)
+    [255, 1]
+    """
+    if isinstance(message, str):
+        message = message.encode("utf-8")
+    return [
+        int.from_bytes(message[block_start: block_start + block_size],
+                       "little")
+        for block_start in range(0, len(message), block_size)
+    ]
+
+
+def get_bytes_from_blocks(
+    block_ints: list[int],
+    message_length: int,
+    block_size: int = DEFAULT_BLOCK_SIZE
+) -> bytes:
+    """
+    Reverses get_blocks_from_text; message_length is in bytes.
+    >>> get_bytes_from_blocks([255, 1], 3, 2)
+    b'\\xff\\x00\\x01'
+    """
+    message = b"".join(block_int.to_bytes(block_size, "little")
+                       for block_int in block_ints)
+    return message[:message_length]
 
 
 def get_text_from_blocks(
@@ -26,27 +49,56 @@ def get_text_from_blocks(
     message_length: int,
     block_size: int = DEFAULT_BLOCK_SIZE
 ) -> str:
-    message: list[str] = []
-    for block_int in block_ints:
-        block_message: list[str] = []
-        for i in range(block_size - 1, -1, -1):
-            if len(message) + i < message_length:
-                ascii_number = block_int // (BYTE_SIZE**i)
-                block_int = block_int % (BYTE_SIZE**i)
-                block_message.insert(0, chr(ascii_number))
-        message.extend(block_message)
-    return "".join(message)
+    """
+    >>> get_text_from_blocks([1819043144, 8559], 6, 4)
+    'Hello!'
+    """
+    return get_bytes_from_blocks(block_ints, message_length,
+                                 block_size).decode("utf-8")
+
+
+def _pow_blocks(blocks: list[int], exponent: int, modulus: int) -> list[int]:
+    return [pow(block, exponent, modulus) for block in blocks]
+
+
+def _crt_pow_blocks(
+    blocks: list[int], crt_key: tuple[int, int, int, int, int]
+) -> list[int]:
+    p, q, dp, dq, q_inv = crt_key
+    result = []
+    for block in blocks:
+        m1 = pow(block, dp, p)
+        m2 = pow(block, dq, q)
+        result.append(m2 + (q_inv * (m1 - m2) % p) * q)
+    return result
+
+
+def _map_chunks(function, blocks: list[int], processes: int | None,
+                *args) -> list[int]:
+    """
+    Applies function(chunk, *args) to order-preserving chunks of blocks,
+    in a process pool when processes > 1, and joins the results.
+    """
+    if processes is None or processes <= 1 or len(blocks) < 2:
+        return function(blocks, *args)
+    chunk_size = -(-len(blocks) // (processes * 4))
+    chunks = [blocks[i: i + chunk_size]
+              for i in range(0, len(blocks), chunk_size)]
+    with ProcessPoolExecutor(processes) as executor:
+        results = executor.map(function, chunks,
+                               *([arg] * len(chunks) for arg in args))
+        return [block for chunk in results for block in chunk]
 
 
 def encrypt_message(
-    message: str, key: tuple[int, int], block_size: int = DEFAULT_BLOCK_SIZE
+    message: str | bytes,
+    key: tuple[int, int],
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    processes: int | None = None,
 ) -> list[int]:
-    encrypted_blocks = []
     n, e = key
-
-    for block in get_blocks_from_text(message, block_size):
-        encrypted_blocks.append(pow(block, e, n))
-    return encrypted_blocks
+    return _map_chunks(_pow_blocks, get_blocks_from_text(message, block_size),
+                       processes, e, n)
 
 
 def decrypt_message(
@@ -54,11 +106,39 @@ def decrypt_message(
     message_length: int,
     key: tuple[int, int],
     block_size: int = DEFAULT_BLOCK_SIZE,
+    processes: int | None = None,
 ) -> str:
-    decrypted_blocks = []
+    """
+    Decrypts the blocks with the private key (n, d). With processes > 1
+    the blocks are decrypted in a process pool, in order-preserving chunks.
+    >>> blocks = encrypt_message("Hello!", (3233, 17), 1)
+    >>> decrypt_message(blocks, 6, (3233, 2753), 1, processes=2)
+    'Hello!'
+    """
     n, d = key
-    for block in encrypted_blocks:
-        decrypted_blocks.append(pow(block, d, n))
+    decrypted_blocks = _map_chunks(_pow_blocks, encrypted_blocks, processes,
+                                   d, n)
+    return get_text_from_blocks(decrypted_blocks, message_length, block_size)
+
+
+def decrypt_message_crt(
+    encrypted_blocks: list[int],
+    message_length: int,
+    crt_key: tuple[int, int, int, int, int],
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    processes: int | None = None,
+) -> str:
+    """
+    Decrypts using the Chinese Remainder Theorem form of the private key,
+    crt_key = (p, q, dP, dQ, qInv) as written by make_key_files. Two
+    exponentiations modulo p and q with half-size exponents replace the
+    one modulo n, which makes every block roughly 3-4 times cheaper.
+    >>> blocks = encrypt_message("Hello!", (3233, 17), 1)
+    >>> decrypt_message_crt(blocks, 6, (61, 53, 53, 49, 38), 1)
+    'Hello!'
+    """
+    decrypted_blocks = _map_chunks(_crt_pow_blocks, encrypted_blocks,
+                                   processes, crt_key)
     return get_text_from_blocks(decrypted_blocks, message_length, block_size)
 
 
@@ -69,6 +149,15 @@ def read_key_file(key_filename: str) -> tuple[int, int, int]:
     return (int(key_size), int(n), int(eor_d))
 
 
+def read_crt_key_file(
+    key_filename: str,
+) -> tuple[int, tuple[int, int, int, int, int]]:
+    with open(key_filename) as fo:
+        content = fo.read()
+    key_size, _, p, q, dp, dq, q_inv = (int(i) for i in content.split(","))
+    return key_size, (p, q, dp, dq, q_inv)
+
+
 def encrypt_and_write_to_file(
     message_filename: str,
     key_filename: str,
@@ -92,14 +181,19 @@ def encrypt_and_write_to_file(
                                                         block_size)]
 
     encrypted_content = ",".join(encrypted_blocks)
-    encrypted_content = f"{len(message)}_{block_size}_{encrypted_content}"
+    message_length = len(message.encode("utf-8"))
+    encrypted_content = f"{message_length}_{block_size}_{encrypted_content}"
     with open(message_filename, "w") as fo:
         fo.write(encrypted_content)
     return encrypted_content
 
 
-def read_from_file_and_decrypt(message_filename: str,
-                               key_filename: str) -> str:
+def read_from_file_and_decrypt(
+    message_filename: str,
+    key_filename: str,
+    crt_key_filename: str | None = None,
+    processes: int | None = None,
+) -> str:
     key_size, n, d = read_key_file(key_filename)
     with open(message_filename) as fo:
         content = fo.read()
@@ -121,10 +215,121 @@ def read_from_file_and_decrypt(message_filename: str,
     for block in encrypted_message.split(","):
         encrypted_blocks.append(int(block))
 
+    if crt_key_filename is not None:
+        _, crt_key = read_crt_key_file(crt_key_filename)
+        return decrypt_message_crt(encrypted_blocks, message_length, crt_key,
+                                   block_size, processes)
+
     return decrypt_message(encrypted_blocks,
                            message_length,
                            (n, d),
-                           block_size)
+                           block_size,
+                           processes)
+
+
+def encrypt_file(
+    source_filename: str,
+    message_filename: str,
+    key_filename: str,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> None:
+    """
+    Encrypts any file into the format written by encrypt_and_write_to_file,
+    reading and writing STREAM_BLOCKS blocks at a time, so the file never
+    has to fit in memory as one string.
+    """
+    key_size, n, e = read_key_file(key_filename)
+    if key_size < block_size * 8:
+        sys.exit(
+            f"ERROR: Block size is {block_size * 8} bits and key size is "
+            f"{key_size} bits. The RSA cipher requires the block size to be "
+            "equal to or greater than the key size."
+        )
+
+    with open(source_filename, "rb") as source, \
+            open(message_filename, "w") as fo:
+        fo.write(f"{os.fstat(source.fileno()).st_size}_{block_size}_")
+        separator = ""
+        while chunk := source.read(block_size * STREAM_BLOCKS):
+            blocks = encrypt_message(chunk, (n, e), block_size)
+            fo.write(separator + ",".join(str(i) for i in blocks))
+            separator = ","
+
+
+def decrypt_file(
+    message_filename: str,
+    destination_filename: str,
+    key_filename: str,
+    crt_key_filename: str | None = None,
+) -> None:
+    """
+    Streaming counterpart of read_from_file_and_decrypt that writes the
+    decrypted bytes to destination_filename. Raises ValueError if the
+    file holds fewer bytes than its header announces.
+    >>> import os, tempfile
+    >>> folder = tempfile.TemporaryDirectory()
+    >>> key = os.path.join(folder.name, "key.txt")
+    >>> message = os.path.join(folder.name, "message.txt")
+    >>> output = os.path.join(folder.name, "output")
+    >>> with open(key, "w") as fo:
+    ...     _ = fo.write("12,3233,2753")
+    >>> blocks = encrypt_message(b"abc", (3233, 17), 1)
+    >>> blocks = ",".join(str(block) for block in blocks)
+    >>> with open(message, "w") as fo:
+    ...     _ = fo.write(f"3_1_{blocks}")
+    >>> decrypt_file(message, output, key)
+    >>> with open(output, "rb") as fo:
+    ...     fo.read()
+    b'abc'
+    >>> with open(message, "w") as fo:
+    ...     _ = fo.write(f"8_1_{blocks}")
+    >>> decrypt_file(message, output, key)
+    Traceback (most recent call last):
+        ...
+    ValueError: Truncated RSA message: 5 bytes missing
+    >>> folder.cleanup()
+    """
+    key_size, n, d = read_key_file(key_filename)
+    if crt_key_filename is not None:
+        _, crt_key = read_crt_key_file(crt_key_filename)
+
+    with open(message_filename) as fo, \
+            open(destination_filename, "wb") as destination:
+        header = ""
+        while header.count("_") < 2 and (text := fo.read(64)):
+            header += text
+        message_length_str, block_size_str, pending = header.split("_", 2)
+        remaining = int(message_length_str)
+        block_size = int(block_size_str)
+        if key_size < block_size * 8:
+            sys.exit(
+                f"ERROR: Block size is {block_size * 8} bits and key size is "
+                f"{key_size} bits. Did you specify the correct key file and "
+                "encrypted file?"
+            )
+
+        while remaining > 0:
+            text = fo.read(STREAM_BLOCKS * (key_size // 3 + 2))
+            pending += text
+            *complete, pending = pending.split(",")
+            if not text:
+                if not pending:
+                    raise ValueError(
+                        f"Truncated RSA message: {remaining} bytes missing")
+                # the last block has no comma after it
+                complete.append(pending)
+                pending = ""
+            if not complete:
+                continue
+            blocks = [int(block) for block in complete]
+            if crt_key_filename is not None:
+                blocks = _crt_pow_blocks(blocks, crt_key)
+            else:
+                blocks = _pow_blocks(blocks, d, n)
+            length = min(remaining, len(blocks) * block_size)
+            destination.write(get_bytes_from_blocks(blocks, length,
+                                                    block_size))
+            remaining -= length
 
 
 def main() -> None:
@@ -152,8 +357,14 @@ def main() -> None:
 
     elif mode == "decrypt":
         privkey_filename = "rsa_privkey.txt"
+        crtkey_filename = "rsa_crtkey.txt"
         print(f"Reading from {filename} and decrypting...")
-        decrypted_text = read_from_file_and_decrypt(filename, privkey_filename)
+        decrypted_text = read_from_file_and_decrypt(
+            filename,
+            privkey_filename,
+            crtkey_filename if os.path.exists(crtkey_filename) else None,
+            os.cpu_count(),
+        )
         print("writing decryption to rsa_decryption.txt...")
         with open("rsa_decryption.txt", "w") as dec:
             dec.write(decrypted_text)
@@ -1,49 +1,238 @@
+import multiprocessing
 import os
 import sys
 import random
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from queue import Empty, Queue
 from . import rabin_miller as rabinMiller  # noqa: N812
 from . import cryptomath_module as cryptoMath  # noqa: N812
 
 
 def main() -> None:
     print("Making key files...")
-    make_key_files("rsa", 1024)
+    make_key_files("rsa", 1024, os.cpu_count())
     print("Key files generation successful.")
 
 
-def generate_key(key_size: int) -> tuple[tuple[int, int], tuple[int, int]]:
-    print("Generating prime p...")
-    p = rabinMiller.generate_large_prime(key_size)
-    print("Generating prime q...")
-    q = rabinMiller.generate_large_prime(key_size)
-    n = p * q
+def generate_key(
+    key_size: int, processes: int | None = None
+) -> tuple[tuple[int, int], tuple[int, int]]:
+    public_key, private_key, _ = generate_crt_key(key_size, processes)
+    return (public_key, private_key)
 
-    print("Generating e that is relatively prime to (p - 1) * (q - 1)...")
+
+def crt_components(p: int, q: int, d: int) -> tuple[int, int, int, int, int]:
+    """
+    Returns (p, q, dP, dQ, qInv), the values that let the private key
+    owner decrypt with two half-size exponentiations (Chinese Remainder
+    Theorem) instead of one with d.
+    >>> crt_components(61, 53, 2753)
+    (61, 53, 53, 49, 38)
+    """
+    return (p, q, d % (p - 1), d % (q - 1), cryptoMath.find_mod_inverse(q, p))
+
+
+# Set in every generate_primes worker; tells the searches to give up
+_stop_search = None
+
+
+def _init_search_worker(stop) -> None:
+    global _stop_search
+    _stop_search = stop
+
+
+def _search_prime(key_size: int, seed: int) -> int | None:
+    # forked workers inherit the parent's random state, so reseed each one
+    random.seed(seed)
+    return rabinMiller.generate_large_prime(key_size, _stop_search)
+
+
+def generate_primes(key_size: int, processes: int = 2) -> tuple[int, int]:
+    """
+    Searches for two distinct key_size-bit primes in a pool of processes,
+    one independent search per worker; the first two results win. The
+    workers share a stop event, so the searches still running end at
+    their next candidate instead of holding on to a CPU.
+    >>> p, q = generate_primes(64, processes=2)
+    >>> p != q, p.bit_length(), q.bit_length()
+    (True, 64, 64)
+    """
+    processes = max(processes, 2)
+    stop = multiprocessing.Event()
+    executor = ProcessPoolExecutor(processes, initializer=_init_search_worker,
+                                   initargs=(stop,))
+    try:
+        pending = {
+            executor.submit(_search_prime, key_size, random.getrandbits(128))
+            for _ in range(processes)
+        }
+        primes: list[int] = []
+        while len(primes) < 2:
+            if not pending:
+                pending.add(executor.submit(_search_prime, key_size,
+                                            random.getrandbits(128)))
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                prime = future.result()
+                if len(primes) < 2 and prime not in primes:
+                    primes.append(prime)
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+    return primes[0], primes[1]
+
+
+def key_from_primes(
+    p: int, q: int, key_size: int
+) -> tuple[tuple[int, int], tuple[int, int], tuple[int, int, int, int, int]]:
+    """
+    Picks e and computes d for the primes p and q.
+    >>> public_key, private_key, crt_key = key_from_primes(61, 53, 8)
+    >>> public_key[0], private_key[0], crt_key[:2]
+    (3233, 3233, (61, 53))
+    >>> public_key[1] * private_key[1] % ((61 - 1) * (53 - 1))
+    1
+    """
+    n = p * q
     while True:
         e = random.randrange(2 ** (key_size - 1), 2 ** (key_size))
         if cryptoMath.gcd(e, (p - 1) * (q - 1)) == 1:
             break
 
-    print("Calculating d that is mod inverse of e...")
     d = cryptoMath.find_mod_inverse(e, (p - 1) * (q - 1))
 
     public_key = (n, e)
     private_key = (n, d)
-    return (public_key, private_key)
+    return (public_key, private_key, crt_components(p, q, d))
 
 
-def make_key_files(name: str, key_size: int) -> None:
-    if os.path.exists(f"{name}\
-                      _pubkey.txt") or os.path.exists(f"{name}_privkey.txt"):
+def generate_crt_key(
+    key_size: int, processes: int | None = None
+) -> tuple[tuple[int, int], tuple[int, int], tuple[int, int, int, int, int]]:
+    if processes is not None and processes > 1:
+        print(f"Generating primes p and q in {processes} processes...")
+        p, q = generate_primes(key_size, processes)
+    else:
+        print("Generating prime p...")
+        p = rabinMiller.generate_large_prime(key_size)
+        print("Generating prime q...")
+        q = rabinMiller.generate_large_prime(key_size)
+
+    print("Generating e that is relatively prime to (p - 1) * (q - 1)...")
+    print("Calculating d that is mod inverse of e...")
+    return key_from_primes(p, q, key_size)
+
+
+class KeyPool:
+    """
+    Keeps up to size key pairs of key_size bits ready, generated by a
+    background thread, so get() returns at once while the pool is not
+    empty. The thread refills the pool to size whenever it drops to
+    low_water keys (by default half of size). Keys are
+    (public_key, private_key, crt_key) tuples as from generate_crt_key.
+    >>> with KeyPool(64, size=2, low_water=1) as pool:
+    ...     public_key, private_key, crt_key = pool.get()
+    ...     pool.get() != (public_key, private_key, crt_key)
+    True
+    >>> public_key[0] == private_key[0] == crt_key[0] * crt_key[1]
+    True
+    """
+
+    def __init__(
+        self,
+        key_size: int,
+        size: int = 8,
+        low_water: int | None = None,
+        processes: int | None = None,
+    ) -> None:
+        if size < 1:
+            raise ValueError("size must be positive")
+        self.key_size = key_size
+        self.size = size
+        self.low_water = size // 2 if low_water is None else low_water
+        self.processes = processes
+        self._keys: Queue = Queue()
+        self._refill = threading.Event()
+        self._closed = threading.Event()
+        self._refill.set()
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+
+    def _new_key(self) -> tuple[tuple[int, int], tuple[int, int],
+                                tuple[int, int, int, int, int]]:
+        if self.processes is not None and self.processes > 1:
+            p, q = generate_primes(self.key_size, self.processes)
+        else:
+            p = rabinMiller.generate_large_prime(self.key_size)
+            q = rabinMiller.generate_large_prime(self.key_size)
+            while q == p:
+                q = rabinMiller.generate_large_prime(self.key_size)
+        return key_from_primes(p, q, self.key_size)
+
+    def _fill(self) -> None:
+        while True:
+            self._refill.wait()
+            if self._closed.is_set():
+                return
+            self._refill.clear()
+            while self._keys.qsize() < self.size:
+                self._keys.put(self._new_key())
+                if self._closed.is_set():
+                    return
+
+    def get(self, timeout: float | None = None) -> tuple[
+        tuple[int, int], tuple[int, int], tuple[int, int, int, int, int]
+    ]:
+        """
+        Takes a key pair, waiting for one to be generated if the pool is
+        empty; raises queue.Empty if none arrives within timeout seconds.
+        """
+        if self._closed.is_set():
+            raise ValueError("KeyPool is closed")
+        try:
+            key = self._keys.get_nowait()
+        except Empty:
+            self._refill.set()
+            key = self._keys.get(timeout=timeout)
+        if self._keys.qsize() <= self.low_water:
+            self._refill.set()
+        return key
+
+    def __len__(self) -> int:
+        return self._keys.qsize()
+
+    def close(self) -> None:
+        """Stops the background thread once its current key is done."""
+        self._closed.set()
+        self._refill.set()
+
+    def __enter__(self) -> "KeyPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def make_key_files(
+    name: str, key_size: int, processes: int | None = None
+) -> None:
+    if (
+        os.path.exists(f"{name}_pubkey.txt")
+        or os.path.exists(f"{name}_privkey.txt")
+        or os.path.exists(f"{name}_crtkey.txt")
+    ):
         print("\nWARNING:")
         print(
-            f'"{name}_pubkey.txt" or "{name}_privkey.txt" already exists. \n'
+            f'"{name}_pubkey.txt", "{name}_privkey.txt" or "{name}_crtkey.txt"'
+            " already exists. \n"
             "Use a different name or delete \
                 these files and re-run this program."
         )
         sys.exit()
 
-    public_key, private_key = generate_key(key_size)
+    public_key, private_key, crt_key = generate_crt_key(key_size,
+                                                        processes)
     print(f"\nWriting public key to file {name}_pubkey.txt...")
     with open(f"{name}_pubkey.txt", "w") as out_file:
         out_file.write(f"{key_size},{public_key[0]},{public_key[1]}")
@@ -52,6 +241,11 @@ def make_key_files(name: str, key_size: int) -> None:
     with open(f"{name}_privkey.txt", "w") as out_file:
         out_file.write(f"{key_size},{private_key[0]},{private_key[1]}")
 
+    print(f"Writing CRT private key to file {name}_crtkey.txt...")
+    with open(f"{name}_crtkey.txt", "w") as out_file:
+        out_file.write(",".join(str(i) for i in (key_size, private_key[0],
+                                                 *crt_key)))
+
 
 if __name__ == "__main__":
     main()
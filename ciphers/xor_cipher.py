@@ -8,9 +8,20 @@ Overview about methods:
 - decrypt_string : str
 - encrypt_file : boolean
 - decrypt_file : boolean
+- xor_bytes : bytes
+- encrypt_file_binary : boolean
+- decrypt_file_binary : boolean
 """
 from __future__ import annotations
 
+import mmap
+
+# default size of the buffers the binary file methods work on
+BUFFER_SIZE = 1 << 20
+
+# keys up to this length are applied with one bytes.translate per key byte
+STRIDED_KEY_LIMIT = 64
+
 
 class XORCipher:
     def __init__(self, key: int = 0):
@@ -153,3 +164,165 @@ class XORCipher:
             return False
 
         return True
+
+    def _binary_key(self, key: int | bytes) -> bytes:
+        """
+        input: 'key' of type int or bytes
+        output: the key as bytes; an int key is reduced the same way
+        as in encrypt_string, so both modes agree on one-byte keys
+        """
+
+        # precondition
+        assert isinstance(key, (int, bytes, bytearray))
+
+        if isinstance(key, (bytes, bytearray)) and key:
+            return bytes(key)
+
+        key = key or self.__key or 1
+
+        # make sure key can be any size
+        while key > 255:
+            key -= 255
+
+        return bytes([key])
+
+    def _xor_chunks(self, key: bytes, buffer_size: int):
+        """
+        input: key (bytes) and the size of the buffers that will be sent
+        output: generator that receives buffers and sends back their XOR
+        with the repeating key, continuing the key where the last buffer
+        stopped
+        """
+        if len(key) == 1:
+            table = bytes(i ^ key[0] for i in range(256))
+            chunk = yield b""
+            while True:
+                chunk = yield chunk.translate(table)
+
+        phase = 0
+        if len(key) <= STRIDED_KEY_LIMIT:
+            # every key byte gets its own translation table, applied to
+            # the strided slice of the buffer that it covers
+            tables = [bytes(i ^ k for i in range(256)) for k in key]
+            chunk = yield b""
+            while True:
+                result = bytearray(chunk)
+                for j in range(len(key)):
+                    table = tables[(phase + j) % len(key)]
+                    result[j::len(key)] = chunk[j::len(key)].translate(table)
+                phase = (phase + len(chunk)) % len(key)
+                chunk = yield bytes(result)
+
+        # long keys: XOR the buffer with the key stream as big integers
+        stream = key * (buffer_size // len(key) + 2)
+        chunk = yield b""
+        while True:
+            size = len(chunk)
+            mask = int.from_bytes(stream[phase: phase + size], "little")
+            result = (int.from_bytes(chunk, "little") ^ mask).to_bytes(
+                size, "little")
+            phase = (phase + size) % len(key)
+            chunk = yield result
+
+    def xor_bytes(self, content: bytes, key: int | bytes = 0) -> bytes:
+        """
+        input: 'content' of type bytes and 'key' of type int or bytes
+        output: 'content' XORed with the repeating key
+        if key not passed the method uses the key by the constructor.
+        otherwise key = 1
+
+        >>> XORCipher().xor_bytes(b"hallo welt", 67)
+        b'+"//,c4&/7'
+        >>> XORCipher().xor_bytes(b"hallo welt", 67) == \\
+        ...     XORCipher().encrypt_string("hallo welt", 67).encode()
+        True
+        >>> secret = XORCipher().xor_bytes(b"hallo welt", b"key")
+        >>> XORCipher().xor_bytes(secret, b"key")
+        b'hallo welt'
+        """
+
+        # precondition
+        assert isinstance(content, (bytes, bytearray, memoryview))
+
+        key = self._binary_key(key)
+        xor = self._xor_chunks(key, len(content))
+        next(xor)
+        return xor.send(bytes(content))
+
+    def encrypt_file_binary(
+        self,
+        source: str,
+        destination: str | None = None,
+        key: int | bytes = 0,
+        buffer_size: int = BUFFER_SIZE,
+    ) -> bool:
+        """
+        input: source filename (str), destination filename (str or None),
+        a key (int or bytes) and the buffer size
+        output: returns true if encrypt process was
+        successful otherwise false
+        The file is read in binary mode and processed one buffer at a
+        time, so memory use does not depend on the file size. Without a
+        destination the file is encrypted in place through an mmap.
+        if key not passed the method uses the key by the constructor.
+        otherwise key = 1
+
+        >>> import os, tempfile
+        >>> with tempfile.TemporaryDirectory() as folder:
+        ...     plain = os.path.join(folder, "plain.bin")
+        ...     secret = os.path.join(folder, "secret.bin")
+        ...     with open(plain, "wb") as f:
+        ...         _ = f.write(bytes(range(256)) * 100)
+        ...     cipher = XORCipher()
+        ...     cipher.encrypt_file_binary(plain, secret, b"abc", 1000)
+        ...     cipher.decrypt_file_binary(secret, key=b"abc", buffer_size=999)
+        ...     with open(secret, "rb") as f:
+        ...         f.read() == bytes(range(256)) * 100
+        True
+        True
+        True
+        """
+
+        # precondition
+        assert isinstance(source, str) and buffer_size > 0
+
+        key = self._binary_key(key)
+        xor = self._xor_chunks(key, buffer_size)
+        next(xor)
+
+        try:
+            if destination is None:
+                with open(source, "r+b") as f:
+                    if not f.seek(0, 2):
+                        return True
+                    with mmap.mmap(f.fileno(), 0) as mapped:
+                        for start in range(0, len(mapped), buffer_size):
+                            end = start + buffer_size
+                            mapped[start:end] = xor.send(mapped[start:end])
+                        mapped.flush()
+            else:
+                with (open(source, "rb") as fin,
+                      open(destination, "wb") as fout):
+                    while chunk := fin.read(buffer_size):
+                        fout.write(xor.send(chunk))
+
+        except OSError:
+            return False
+
+        return True
+
+    def decrypt_file_binary(
+        self,
+        source: str,
+        destination: str | None = None,
+        key: int | bytes = 0,
+        buffer_size: int = BUFFER_SIZE,
+    ) -> bool:
+        """
+        input: source filename (str), destination filename (str or None),
+        a key (int or bytes) and the buffer size
+        output: returns true if decrypt process was
+        successful otherwise false
+        XOR is its own inverse, so this is encrypt_file_binary.
+        """
+        return self.encrypt_file_binary(source, destination, key, buffer_size)
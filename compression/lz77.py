@@ -32,8 +32,31 @@ en.wikipedia.org/wiki/LZ77_and_LZ78
 """
 
 
+import random
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 
+# Packed container written by LZ77Compressor.compress_to_bytes
+CONTAINER_MAGIC = b"LZ77"
+CONTAINER_VERSION = 2
+# flag bit: the input was str, stored as UTF-8
+FLAG_TEXT = 1
+# uncompressed bytes covered by one block of the container
+BLOCK_SIZE = 1 << 16
+
+# Framed format written by LZ77Compressor.compress_framed: independent
+# frames, then an index, then a fixed-size footer
+FRAMED_MAGIC = b"LZ7F"
+FRAMED_VERSION = 1
+FOOTER_MAGIC = b"LZ7I"
+# index position (8 bytes) and frame count (4 bytes), then FOOTER_MAGIC
+FOOTER_SIZE = 12 + len(FOOTER_MAGIC)
+# uncompressed bytes per frame
+FRAME_SIZE = 1 << 20
+
 
 @dataclass
 class Token:
@@ -41,11 +64,13 @@ class Token:
     Dataclass representing a triplet, called token,
     consisting of length, offset, and indicator.
     This triplet is used during LZ77 compression.
+    The indicator is a character for str input and a byte value (int)
+    for bytes input.
     """
 
     offset: int
     length: int
-    indicator: str
+    indicator: str | int
 
     def __repr__(self) -> str:
         """
@@ -58,24 +83,278 @@ class Token:
         return f"({self.offset}, {self.length}, {self.indicator})"
 
 
+class _MatchFinder:
+    """
+    Hash-chain match finder over one text.
+    Every position of the search buffer is chained to the previous position
+    that starts with the same 3 characters, most recent first, so a search
+    only visits positions that can give a match of length 3 or more.
+    Shorter matches only need the most recent occurrence of the first 1 or
+    2 characters, which str.rfind finds. With chain_depth None every
+    candidate is visited and the result is the longest match, the smallest
+    offset on ties, exactly as a scan of the whole search buffer would find.
+    """
+
+    # characters compared at once when extending a match
+    _STEP = 64
+
+    def __init__(self, text: str | bytes, search_buffer_size: int,
+                 chain_depth: int | None = None) -> None:
+        self.text = text
+        self.search_buffer_size = search_buffer_size
+        self.chain_depth = chain_depth
+        # head[prefix]: latest position; prev[p % size]: the one before p
+        self.head: dict[str | bytes, int] = {}
+        self.prev = [-1] * max(search_buffer_size, 1)
+        self.inserted = 0
+
+    def _insert_until(self, position: int) -> None:
+        text, head, prev = self.text, self.head, self.prev
+        size = len(prev)
+        # positions without 3 characters left never start a long match
+        for p in range(self.inserted, min(position, len(text) - 2)):
+            prefix = text[p: p + 3]
+            prev[p % size] = head.get(prefix, -1)
+            head[prefix] = p
+        self.inserted = max(self.inserted, min(position, len(text) - 2))
+
+    def discard(self, count: int) -> None:
+        """
+        Drops the first count characters of the text, a multiple of the
+        search buffer size so the chain ring keeps its slots, and moves
+        every stored position back by count. Prefixes last seen before the
+        new start are forgotten, which keeps memory bounded when streaming.
+        """
+        self.text = self.text[count:]
+        self.head = {prefix: p - count for prefix, p in self.head.items()
+                     if p >= count}
+        self.prev = [p - count for p in self.prev]
+        self.inserted -= count
+
+    def _match_length(self, candidate: int, position: int,
+                      max_length: int) -> int:
+        text, step = self.text, self._STEP
+        length = 0
+        while length < max_length:
+            chunk = min(step, max_length - length)
+            if (text[candidate + length: candidate + length + chunk]
+                    == text[position + length: position + length + chunk]):
+                length += chunk
+                continue
+            while text[candidate + length] == text[position + length]:
+                length += 1
+            break
+        return length
+
+    def find(self, position: int,
+             max_length: int | None = None) -> tuple[int, int]:
+        """
+        Returns (offset, length) of the best match for text[position:],
+        at most max_length long and leaving at least one character for
+        the token indicator.
+        """
+        self._insert_until(position)
+        text = self.text
+        lowest = max(position - self.search_buffer_size, 0)
+        if max_length is None or max_length > len(text) - position - 1:
+            max_length = len(text) - position - 1
+        offset = length = 0
+        if max_length <= 0 or self.search_buffer_size <= 0:
+            return offset, length
+
+        if max_length >= 3:
+            prev = self.prev
+            size = len(prev)
+            depth = self.chain_depth
+            candidate = self.head.get(text[position: position + 3], -1)
+            while candidate >= lowest and depth != 0:
+                # a longer match must also agree at the current length
+                if text[candidate + length] == text[position + length]:
+                    found = self._match_length(candidate, position,
+                                               max_length)
+                    if found > length:
+                        offset, length = position - candidate, found
+                        if length == max_length:
+                            break
+                candidate = prev[candidate % size]
+                if depth is not None:
+                    depth -= 1
+            if length:
+                return offset, length
+
+        # the match may run into the text being encoded, as for long ones
+        for prefix_length in (2, 1):
+            if prefix_length <= max_length:
+                prefix = text[position: position + prefix_length]
+                candidate = text.rfind(prefix, lowest,
+                                       position + prefix_length - 1)
+                if candidate >= 0:
+                    return position - candidate, prefix_length
+        return offset, length
+
+
+def _write_varint(output: bytearray, value: int) -> None:
+    """
+    Appends value as an unsigned LEB128 varint: 7 bits per byte, the high
+    bit set on every byte but the last.
+    >>> output = bytearray()
+    >>> _write_varint(output, 300)
+    >>> output
+    bytearray(b'\\xac\\x02')
+    """
+    while value > 0x7F:
+        output.append(value & 0x7F | 0x80)
+        value >>= 7
+    output.append(value)
+
+
+def _read_varint(data: bytes, position: int) -> tuple[int, int]:
+    """
+    Reads a varint written by _write_varint; returns it with the position
+    after it.
+    >>> _read_varint(b"\\x00\\xac\\x02", 1)
+    (300, 3)
+    """
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def _copy_match(output: bytearray | list, position: int, offset: int,
+                length: int) -> None:
+    """
+    Writes the length characters found offset positions back to
+    output[position:], in slices; an overlapping match repeats the last
+    offset characters, so each copied slice may be twice as long as the
+    one before.
+    >>> output = bytearray(b"ab") + bytearray(5)
+    >>> _copy_match(output, 2, 2, 5)
+    >>> output
+    bytearray(b'abababa')
+    """
+    if not 0 < offset <= position:
+        raise ValueError(f"Token ({offset}, {length}, ...) points outside "
+                         "the decompressed text")
+    source = position - offset
+    copied = 0
+    while copied < length:
+        count = min(length - copied, offset + copied)
+        output[position + copied: position + copied + count] = \
+            output[source: source + count]
+        copied += count
+
+
+def _write_block(output: bytearray, raw: bytes, start: int, end: int,
+                 matches: bytearray, literals: bytearray) -> None:
+    # appends one container block and empties matches and literals
+    _write_varint(output, len(literals))
+    _write_varint(output, end - start)
+    output += zlib.crc32(memoryview(raw)[start:end]).to_bytes(4, "big")
+    _write_varint(output, len(matches))
+    output += matches
+    output += literals
+    matches.clear()
+    literals.clear()
+
+
+def _write_header(output: bytearray, flags: int,
+                  search_buffer_size: int) -> None:
+    output += CONTAINER_MAGIC
+    output += bytes((CONTAINER_VERSION, flags))
+    _write_varint(output, search_buffer_size)
+
+
+def _read_header(packed: bytes) -> tuple[int, int, int]:
+    """
+    Reads a container header; returns the flags, the search buffer size
+    the data was compressed with and the position of the first block.
+    Raises IndexError if the header is incomplete.
+    >>> _read_header(b"LZ77\\x02\\x01\\x80\\x02")
+    (1, 256, 8)
+    """
+    if not packed.startswith(CONTAINER_MAGIC[:len(packed)]):
+        raise ValueError("Not an LZ77 container")
+    position = len(CONTAINER_MAGIC)
+    version, flags = packed[position], packed[position + 1]
+    if version != CONTAINER_VERSION:
+        raise ValueError(f"Unsupported LZ77 container version {version}")
+    search_buffer_size, position = _read_varint(packed, position + 2)
+    return flags, search_buffer_size, position
+
+
+def _read_block(packed: bytes, position: int, output: bytearray
+                ) -> int | None:
+    # appends the bytes of the block at position to output; returns the
+    # position after it, or None at the end marker
+    count, position = _read_varint(packed, position)
+    if count == 0:
+        return None
+    raw_length, position = _read_varint(packed, position)
+    checksum = int.from_bytes(packed[position: position + 4], "big")
+    match_size, position = _read_varint(packed, position + 4)
+    literals = position + match_size
+    if literals + count > len(packed):
+        raise IndexError
+
+    # read every (offset, length) first, so raw_length is checked against
+    # the tokens before any output is allocated for it
+    matches = []
+    for _ in range(count):
+        offset, position = _read_varint(packed, position)
+        length, position = _read_varint(packed, position)
+        matches.append((offset, length))
+    if (position != literals
+            or sum(length for _, length in matches) + count != raw_length):
+        raise ValueError("Corrupt LZ77 block: sizes do not match")
+
+    start = output_position = len(output)
+    output += bytes(raw_length)
+    for (offset, length), literal in zip(
+            matches, packed[literals: literals + count]):
+        if length:
+            _copy_match(output, output_position, offset, length)
+            output_position += length
+        output[output_position] = literal
+        output_position += 1
+    if zlib.crc32(memoryview(output)[start:]) != checksum:
+        raise ValueError("LZ77 block checksum mismatch")
+    return literals + count
+
+
 class LZ77Compressor:
     """
     Class containing compress and decompress methods using
     LZ77 compression algorithm.
+    chain_depth limits how many earlier positions with the same 3-character
+    prefix are tried per token. None (the default) tries all of them and
+    always finds the longest match; a limit trades ratio for speed on large
+    windows.
     """
 
     def __init__(self,
                  window_size: int = 13,
-                 lookahead_buffer_size: int = 6) -> None:
+                 lookahead_buffer_size: int = 6,
+                 chain_depth: int | None = None) -> None:
         self.window_size = window_size
         self.lookahead_buffer_size = lookahead_buffer_size
         self.search_buffer_size = self.window_size - self.lookahead_buffer_size
+        self.chain_depth = chain_depth
 
-    def compress(self, text: str) -> list[Token]:
+    def compress(self, text: str | bytes | bytearray | memoryview
+                 ) -> list[Token]:
         """
         Compresses a given string text using the LZ77 compression algorithm.
+        The text is only ever indexed, never re-sliced, so the time is
+        linear in its length. bytes-like input gives tokens whose
+        indicators are byte values; a bytearray or memoryview is copied
+        to bytes once.
         Args:
-            text: string to be compressed
+            text: string or bytes to be compressed
         Returns:
             output: the compressed text as a list of Tokens
         >>> lz77_compressor = LZ77Compressor()
@@ -83,35 +362,31 @@ class LZ77Compressor:
         '[(0, 0, a), (0, 0, b), (2, 2, c), (4, 3, a), (2, 2, a)]'
         >>> str(lz77_compressor.compress("aacaacabcabaaac"))
         '[(0, 0, a), (1, 1, c), (3, 4, b), (3, 3, a), (1, 2, c)]'
+        >>> str(lz77_compressor.compress("aaaaaa"))
+        '[(0, 0, a), (1, 4, a)]'
+        >>> str(lz77_compressor.compress(memoryview(b"abab")))
+        '[(0, 0, 97), (0, 0, 98), (2, 1, 98)]'
         """
 
-        output = []
-        search_buffer = ""
+        return [Token(*triplet) for triplet in self._triplets(text)]
+
+    def _triplets(self, text: str | bytes | bytearray | memoryview):
+        # yields (offset, length, indicator) without building Tokens
+        if not isinstance(text, (str, bytes)):
+            text = bytes(text)
+        finder = _MatchFinder(text, self.search_buffer_size, self.chain_depth)
+        position = 0
 
         # while there are still characters in text to compress
-        while text:
+        while position < len(text):
             # find the next encoding phrase -
             # triplet with offset, length, indicator
             # (the next encoding character)
-            token = self._find_encoding_token(text, search_buffer)
-
-            # update the search buffer:
-            # - add new characters from the text to it.
-            # - check if the maximum size of the search buffer is not exceeded.
-            #     If so, discard the oldest elements
-            search_buffer += text[: token.length + 1]
-            if len(search_buffer) > self.search_buffer_size:
-                search_buffer = search_buffer[-self.search_buffer_size:]
-
-            # update the text
-            text = text[token.length + 1:]
-
-            # append the token to output
-            output.append(token)
+            offset, length = finder.find(position)
+            yield offset, length, text[position + length]
+            position += length + 1
 
-        return output
-
-    def decompress(self, tokens: list[Token]) -> str:
+    def decompress(self, tokens: list[Token]) -> str | bytes:
         """
         Converts a list of tokens into an output string.
         Args:
@@ -130,15 +405,248 @@ class LZ77Compressor:
             >>> lz77_compressor.decompress([Token(0, 0, 'a'), Token(1, 1, 'c'),
             ... Token(3, 4, 'b'), Token(3, 3, 'a'), Token(1, 2, 'c')])
             'aacaacabcabaaac'
+            >>> lz77_compressor.decompress([Token(0, 0, 97), Token(1, 9, 98)])
+            b'aaaaaaaaaab'
+            >>> lz77_compressor.decompress([Token(2, 1, 'a')])
+            Traceback (most recent call last):
+                ...
+            ValueError: Token (2, 1, ...) points outside the decompressed text
         """
 
-        output = ""
+        # the output is allocated once; str output is built as a list of
+        # characters and joined at the end
+        size = sum(token.length + 1 for token in tokens)
+        is_bytes = bool(tokens) and isinstance(tokens[0].indicator, int)
+        output: bytearray | list[str] = (bytearray(size) if is_bytes
+                                         else [""] * size)
 
+        position = 0
         for token in tokens:
-            for _ in range(token.length):
-                output += output[-token.offset]
-            output += token.indicator
+            if token.length:
+                _copy_match(output, position, token.offset, token.length)
+                position += token.length
+            output[position] = token.indicator
+            position += 1
+
+        return bytes(output) if is_bytes else "".join(output)
+
+    def compress_to_bytes(self, data: str | bytes | bytearray | memoryview
+                          ) -> bytes:
+        """
+        Compresses data into the packed container format, a few bytes per
+        token instead of a Token object each:
+            header: CONTAINER_MAGIC, CONTAINER_VERSION, a flags byte
+                    (FLAG_TEXT: data was str, compressed as UTF-8) and
+                    the varint search buffer size, which bounds offsets
+            blocks: varint token count, varint uncompressed length,
+                    CRC32 of the uncompressed bytes (4 bytes, big endian),
+                    varint size of the match section, the match section
+                    (varint offset and varint length per token), then the
+                    literals (the indicator byte of every token)
+            end:    a token count of 0
+        Each block covers about BLOCK_SIZE uncompressed bytes; its matches
+        may reach back into earlier blocks.
+        >>> packed = LZ77Compressor().compress_to_bytes("ababcbababaa")
+        >>> packed[:7], len(packed)
+        (b'LZ77\\x02\\x01\\x07', 30)
+        """
+        flags = FLAG_TEXT if isinstance(data, str) else 0
+        raw = data.encode("utf-8") if isinstance(data, str) else bytes(data)
+        output = bytearray()
+        _write_header(output, flags, max(self.search_buffer_size, 0))
+
+        matches = bytearray()
+        literals = bytearray()
+        block_start = position = 0
+        for offset, length, indicator in self._triplets(raw):
+            _write_varint(matches, offset)
+            _write_varint(matches, length)
+            literals.append(indicator)
+            position += length + 1
+            if position - block_start >= BLOCK_SIZE:
+                _write_block(output, raw, block_start, position, matches,
+                             literals)
+                block_start = position
+        if literals:
+            _write_block(output, raw, block_start, position, matches,
+                         literals)
+        _write_varint(output, 0)
+        return bytes(output)
+
+    def decompress_from_bytes(self, packed: bytes) -> str | bytes:
+        """
+        Decompresses the output of compress_to_bytes, checking the CRC32 of
+        every block.
+        >>> lz77_compressor = LZ77Compressor()
+        >>> lz77_compressor.decompress_from_bytes(
+        ...     lz77_compressor.compress_to_bytes("cabracadabrarrarrad"))
+        'cabracadabrarrarrad'
+        >>> lz77_compressor.decompress_from_bytes(
+        ...     lz77_compressor.compress_to_bytes(b"\\x00\\xff" * 4))
+        b'\\x00\\xff\\x00\\xff\\x00\\xff\\x00\\xff'
+        >>> lz77_compressor.decompress_from_bytes(b"LZ78\\x02\\x00\\x00")
+        Traceback (most recent call last):
+            ...
+        ValueError: Not an LZ77 container
+        >>> lz77_compressor.decompress_from_bytes(  # claims 2**45 bytes
+        ...     b"LZ77\\x02\\x00\\x08\\x01\\x80\\x80\\x80\\x80\\x80\\x80\\x08"
+        ...     b"\\x00\\x00\\x00\\x00\\x02\\x00\\x00a\\x00")
+        Traceback (most recent call last):
+            ...
+        ValueError: Corrupt LZ77 block: sizes do not match
+        """
+        output = bytearray()
+        try:
+            flags, _, position = _read_header(packed)
+            while True:
+                position = _read_block(packed, position, output)
+                if position is None:
+                    break
+        except IndexError:
+            raise ValueError("Truncated LZ77 container") from None
+        if flags & FLAG_TEXT:
+            return output.decode("utf-8")
+        return bytes(output)
+
+    def compressobj(self) -> "LZ77StreamCompressor":
+        """
+        Returns an object that compresses bytes chunk by chunk into the
+        format of compress_to_bytes, in bounded memory.
+        >>> lz77_compressor = LZ77Compressor()
+        >>> stream = lz77_compressor.compressobj()
+        >>> packed = stream.compress(b"abcabc") + stream.compress(b"abcab")
+        >>> packed += stream.flush()
+        >>> lz77_compressor.decompress_from_bytes(packed)
+        b'abcabcabcab'
+        """
+        return LZ77StreamCompressor(self)
 
+    def decompressobj(self) -> "LZ77StreamDecompressor":
+        """
+        Returns an object that decompresses the format of compress_to_bytes
+        chunk by chunk, in bounded memory.
+        >>> lz77_compressor = LZ77Compressor()
+        >>> packed = lz77_compressor.compress_to_bytes(b"abcabcabcab")
+        >>> stream = lz77_compressor.decompressobj()
+        >>> b"".join(stream.decompress(packed[i: i + 5])
+        ...          for i in range(0, len(packed), 5))
+        b'abcabcabcab'
+        >>> stream.eof
+        True
+        """
+        return LZ77StreamDecompressor()
+
+    def compress_framed(self, data: str | bytes | bytearray | memoryview,
+                        frame_size: int = FRAME_SIZE,
+                        processes: int | None = None) -> bytes:
+        """
+        Splits data into frames of frame_size bytes that are compressed
+        independently (matches never cross a frame), in a pool of processes
+        when processes > 1. Layout:
+            header: FRAMED_MAGIC, FRAMED_VERSION and a flags byte
+                    (FLAG_TEXT: data was str, compressed as UTF-8)
+            frames: each one a compress_to_bytes container
+            index:  varint compressed size and varint uncompressed size
+                    of every frame
+            footer: position of the index (8 bytes) and number of frames
+                    (4 bytes), big endian, then FOOTER_MAGIC
+        The footer and index locate any frame without decoding the others;
+        a little ratio is lost at every frame start.
+        >>> lz77_compressor = LZ77Compressor()
+        >>> packed = lz77_compressor.compress_framed(b"abcabcabcab", 4)
+        >>> lz77_compressor.frame_index(packed)
+        [(6, 27, 0, 4), (33, 27, 4, 4), (60, 24, 8, 3)]
+        >>> lz77_compressor.decompress_framed(packed)
+        b'abcabcabcab'
+        """
+        if frame_size <= 0:
+            raise ValueError("frame_size must be positive")
+        flags = FLAG_TEXT if isinstance(data, str) else 0
+        raw = data.encode("utf-8") if isinstance(data, str) else bytes(data)
+        frames = [raw[start: start + frame_size]
+                  for start in range(0, len(raw), frame_size)]
+        settings = (self.window_size, self.lookahead_buffer_size,
+                    self.chain_depth)
+
+        output = bytearray(FRAMED_MAGIC)
+        output += bytes((FRAMED_VERSION, flags))
+        index = bytearray()
+        for frame, packed in zip(frames, _map_frames(
+                _compress_frame, frames, settings, processes)):
+            output += packed
+            _write_varint(index, len(packed))
+            _write_varint(index, len(frame))
+        index_position = len(output)
+        output += index
+        output += index_position.to_bytes(8, "big")
+        output += len(frames).to_bytes(4, "big")
+        output += FOOTER_MAGIC
+        return bytes(output)
+
+    def frame_index(self, packed: bytes) -> list[tuple[int, int, int, int]]:
+        """
+        Reads the index of compress_framed output: (position, compressed
+        size, uncompressed position, uncompressed size) of every frame.
+        Only the header, footer and index are read, so packed may also be
+        an mmap of a large file.
+        """
+        if (packed[:len(FRAMED_MAGIC)] != FRAMED_MAGIC
+                or packed[-len(FOOTER_MAGIC):] != FOOTER_MAGIC
+                or len(packed) < len(FRAMED_MAGIC) + 2 + FOOTER_SIZE):
+            raise ValueError("Not a framed LZ77 stream")
+        version = packed[len(FRAMED_MAGIC)]
+        if version != FRAMED_VERSION:
+            raise ValueError(f"Unsupported framed LZ77 version {version}")
+        footer = packed[-FOOTER_SIZE:]
+        index_position = int.from_bytes(footer[:8], "big")
+        count = int.from_bytes(footer[8:12], "big")
+        index = bytes(packed[index_position: len(packed) - FOOTER_SIZE])
+
+        frames = []
+        position = len(FRAMED_MAGIC) + 2
+        raw_position = cursor = 0
+        try:
+            for _ in range(count):
+                size, cursor = _read_varint(index, cursor)
+                raw_size, cursor = _read_varint(index, cursor)
+                frames.append((position, size, raw_position, raw_size))
+                position += size
+                raw_position += raw_size
+        except IndexError:
+            raise ValueError("Truncated framed LZ77 index") from None
+        if position != index_position:
+            raise ValueError("Framed LZ77 index does not match the frames")
+        return frames
+
+    def decompress_frame(self, packed: bytes, frame: int) -> bytes:
+        """
+        Decompresses only frame number frame of compress_framed output.
+        Frames are cut at byte boundaries, so the bytes are returned even
+        for str input.
+        >>> lz77_compressor = LZ77Compressor()
+        >>> packed = lz77_compressor.compress_framed(b"abcabcabcab", 4)
+        >>> lz77_compressor.decompress_frame(packed, 1)
+        b'bcab'
+        """
+        position, size, _, _ = self.frame_index(packed)[frame]
+        return _decompress_frame(bytes(packed[position: position + size]))
+
+    def decompress_framed(self, packed: bytes,
+                          processes: int | None = None) -> str | bytes:
+        """
+        Decompresses compress_framed output, in a pool of processes when
+        processes > 1.
+        >>> lz77_compressor = LZ77Compressor()
+        >>> lz77_compressor.decompress_framed(
+        ...     lz77_compressor.compress_framed("sliding window " * 3, 16))
+        'sliding window sliding window sliding window '
+        """
+        frames = [bytes(packed[position: position + size])
+                  for position, size, _, _ in self.frame_index(packed)]
+        output = b"".join(_map_frames(_decompress_frame, frames, None,
+                                      processes))
+        if packed[len(FRAMED_MAGIC) + 1] & FLAG_TEXT:
+            return output.decode("utf-8")
         return output
 
     def _find_encoding_token(self, text: str, search_buffer: str) -> Token:
@@ -158,30 +666,16 @@ class LZ77Compressor:
             ValueError: We need some text to work with.
             >>> lz77_compressor._find_encoding_token("abc", "").offset
             0
+            >>> lz77_compressor._find_encoding_token("aaa", "a")
+            (1, 2, a)
         """  # noqa: E501
 
         if not text:
             raise ValueError("We need some text to work with.")
 
-        # initialise result parameters to default values
-        length, offset = 0, 0
-
-        if not search_buffer:
-            return Token(offset, length, text[length])
-
-        for i, character in enumerate(search_buffer):
-            found_offset = len(search_buffer) - i
-            if character == text[0]:
-                found_length = self._match_length_from_index(text,
-                                                             search_buffer,
-                                                             0,
-                                                             i)
-                # if the found length is greater than or equal to
-                # the current length, which means that the offset is smaller:
-                # update the offset and the length
-                if found_length >= length:
-                    offset, length = found_offset, found_length
-
+        finder = _MatchFinder(search_buffer + text, len(search_buffer),
+                              self.chain_depth)
+        offset, length = finder.find(len(search_buffer))
         return Token(offset, length, text[length])
 
     def _match_length_from_index(
@@ -212,6 +706,180 @@ class LZ77Compressor:
         )
 
 
+def _compress_frame(frame: bytes,
+                    settings: tuple[int, int, int | None]) -> bytes:
+    return LZ77Compressor(*settings).compress_to_bytes(frame)
+
+
+def _decompress_frame(frame: bytes, settings: None = None) -> bytes:
+    return LZ77Compressor().decompress_from_bytes(frame)
+
+
+def _map_frames(function, frames: list[bytes], settings,
+                processes: int | None) -> list[bytes]:
+    # function(frame, settings) for every frame, in order
+    if processes is None or processes <= 1 or len(frames) < 2:
+        return [function(frame, settings) for frame in frames]
+    with ProcessPoolExecutor(processes) as executor:
+        return list(executor.map(function, frames,
+                                 [settings] * len(frames)))
+
+
+class LZ77StreamCompressor:
+    """
+    Incremental compressor made by LZ77Compressor.compressobj.
+    Every compress call returns one container block with the tokens that
+    can already be decided, flush ends the stream. A token needs
+    lookahead_buffer_size bytes after it before it is decided, so matches
+    are at most lookahead_buffer_size long, and only the search buffer and
+    undecided bytes are kept: memory is bounded by the window size plus
+    the largest chunk, however long the stream is.
+    """
+
+    def __init__(self, compressor: LZ77Compressor) -> None:
+        self.lookahead_buffer_size = compressor.lookahead_buffer_size
+        self.search_buffer_size = max(compressor.search_buffer_size, 0)
+        self._finder = _MatchFinder(b"", self.search_buffer_size,
+                                    compressor.chain_depth)
+        # position of the next token in the finder's text
+        self._position = 0
+        self._started = False
+        self._finished = False
+
+    def compress(self, data: bytes | bytearray | memoryview) -> bytes:
+        if self._finished:
+            raise ValueError("compress() called after flush()")
+        self._finder.text += bytes(data)
+        return self._encode(final=False)
+
+    def flush(self) -> bytes:
+        if self._finished:
+            raise ValueError("flush() called twice")
+        output = self._encode(final=True)
+        self._finished = True
+        return output + b"\x00"
+
+    def _encode(self, final: bool) -> bytes:
+        output = bytearray()
+        if not self._started:
+            _write_header(output, 0, self.search_buffer_size)
+            self._started = True
+
+        finder = self._finder
+        lookahead = self.lookahead_buffer_size
+        # without final, a token needs its whole lookahead buffer
+        end = len(finder.text) - (0 if final else lookahead)
+        matches = bytearray()
+        literals = bytearray()
+        start = position = self._position
+        while position < end:
+            offset, length = finder.find(position, lookahead)
+            _write_varint(matches, offset)
+            _write_varint(matches, length)
+            literals.append(finder.text[position + length])
+            position += length + 1
+        if literals:
+            _write_block(output, finder.text, start, position, matches,
+                         literals)
+        self._position = position
+
+        # drop history that is out of the search buffer
+        ring = max(self.search_buffer_size, 1)
+        discard = (position - self.search_buffer_size) // ring * ring
+        if discard > 0:
+            finder.discard(discard)
+            self._position -= discard
+        return bytes(output)
+
+
+class LZ77StreamDecompressor:
+    """
+    Incremental decompressor made by LZ77Compressor.decompressobj.
+    decompress returns the bytes of every block completed by the data fed
+    so far; only the search buffer of output and an incomplete block of
+    input are kept. The search buffer size is read from the stream header,
+    so any compressor's output can be decoded.
+    """
+
+    def __init__(self) -> None:
+        self.search_buffer_size = 0
+        self._input = b""
+        self._history = bytearray()
+        self._started = False
+        self.eof = False
+
+    def decompress(self, data: bytes | bytearray | memoryview) -> bytes:
+        if self.eof:
+            raise ValueError("decompress() called after the end of stream")
+        self._input += bytes(data)
+        position = 0
+        if not self._started:
+            try:
+                _, self.search_buffer_size, position = _read_header(
+                    self._input)
+            except IndexError:
+                # the rest of the header has not arrived yet
+                return b""
+            self._started = True
+
+        history = self._history
+        emitted = len(history)
+        while True:
+            try:
+                next_position = _read_block(self._input, position, history)
+            except IndexError:
+                # the rest of the block has not arrived yet
+                break
+            if next_position is None:
+                self.eof = True
+                position = _read_varint(self._input, position)[1]
+                break
+            position = next_position
+        self._input = self._input[position:]
+
+        output = bytes(history[emitted:])
+        if len(history) > self.search_buffer_size:
+            del history[:len(history) - self.search_buffer_size]
+        return output
+
+
+def benchmark(
+    sizes: tuple[int, ...] = (10**3, 10**4, 10**5, 10**6, 10**7),
+    compressor: LZ77Compressor | None = None,
+) -> dict[int, tuple[float, float]]:
+    """
+    Measures compress and decompress throughput in MB/s for inputs of the
+    given sizes in bytes. Linear scaling shows up as a steady MB/s across
+    sizes. The input is text-like: random words from a small vocabulary.
+    By default a 32 KiB window with chain_depth 16 is used. The packed
+    format is measured, as a Token object per token would take many
+    times the memory of the input.
+    """
+    compressor = compressor or LZ77Compressor(32768 + 258, 258, 16)
+    rng = random.Random(0)
+    words = [bytes(rng.choices(b"etaoinshrdlu", k=rng.randint(2, 9)))
+             for _ in range(2000)]
+    results = {}
+    for size in sizes:
+        data = bytearray()
+        while len(data) < size:
+            data += b" ".join(rng.choices(words, k=1000)) + b"\n"
+        data = bytes(data[:size])
+
+        start = time.perf_counter()
+        packed = compressor.compress_to_bytes(data)
+        middle = time.perf_counter()
+        assert compressor.decompress_from_bytes(packed) == data
+        end = time.perf_counter()
+
+        results[size] = (size / 1e6 / (middle - start),
+                         size / 1e6 / (end - middle))
+        print(f"{size:>11} B: compress {results[size][0]:.3f} MB/s, "
+              f"decompress {results[size][1]:.3f} MB/s, "
+              f"{len(packed)} bytes packed")
+    return results
+
+
 if __name__ == "__main__":
     from doctest import testmod
 
@@ -226,3 +894,6 @@ if __name__ == "__main__":
     decompressed_text = lz77_compressor.decompress(compressed_text)
     assert decompressed_text == TEXT, \
         "The LZ77 algorithm returned the invalid result."
+
+    if "--benchmark" in sys.argv:
+        benchmark()
@@ -0,0 +1,19 @@
+"""
+NumPy is optional: only the vectorized functions of elf.py need it, so
+their doctests are skipped when it is not installed.
+"""
+
+import importlib.util
+
+import pytest
+
+NUMPY_DOCTESTS = ("elf.elf_hash_many", "elf.elf_buckets")
+
+
+def pytest_collection_modifyitems(items: list[pytest.Item]) -> None:
+    if importlib.util.find_spec("numpy") is not None:
+        return
+    skip = pytest.mark.skip(reason="NumPy is not installed")
+    for item in items:
+        if item.name.endswith(NUMPY_DOCTESTS):
+            item.add_marker(skip)
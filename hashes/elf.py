@@ -1,3 +1,11 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
 def elf_hash(data: str) -> int:
     """Implementation of ElfHash Algorithm,
     a variant of PJW hash function.
@@ -14,6 +22,100 @@ def elf_hash(data: str) -> int:
     return hash_
 
 
+def elf_hash_many(keys: list[str | bytes]) -> np.ndarray:
+    """ElfHash of many keys at once, vectorized with NumPy.
+    The keys are laid out as rows of a zero-padded byte matrix sorted by
+    length, so step j only touches the rows of keys longer than j.
+    str keys with code points of 256 or more cannot be laid out as bytes;
+    they, and the rare keys whose intermediate value leaves 32 bits, are
+    hashed with elf_hash, so the results always match it.
+    >>> elf_hash_many(['lorem ipsum', 'abc', '']).tolist()
+    [253956621, 26499, 0]
+    >>> keys = [f'symbol_{i}' for i in range(1000)]
+    >>> elf_hash_many(keys).tolist() == [elf_hash(key) for key in keys]
+    True
+    >>> elf_hash_many([b'lorem ipsum']).tolist()
+    [253956621]
+    >>> elf_hash_many(['abc', 'ünïcødé ✓']).tolist() == [
+    ...     elf_hash('abc'), elf_hash('ünïcødé ✓')]
+    True
+    """
+    import numpy as np
+
+    encoded = []
+    wide = []
+    for i, key in enumerate(keys):
+        if isinstance(key, str):
+            try:
+                key = key.encode("latin-1")
+            except UnicodeEncodeError:
+                wide.append(i)
+                key = b""
+        encoded.append(bytes(key))
+    lengths = np.array([len(key) for key in encoded], dtype=np.int64)
+    hashes = np.zeros(len(encoded), dtype=np.uint64)
+    if encoded and lengths.max():
+        _elf_hash_rows(encoded, lengths, hashes)
+    for i in wide:
+        hashes[i] = elf_hash(keys[i])
+    return hashes
+
+
+def _elf_hash_rows(encoded: list[bytes], lengths: np.ndarray,
+                   hashes: np.ndarray) -> None:
+    """Fills hashes with the ElfHash of the byte strings in encoded."""
+    import numpy as np
+
+    # longest keys first, so the keys still active at step j are a prefix
+    order = np.argsort(-lengths, kind="stable")
+    sorted_lengths = lengths[order]
+    width = int(sorted_lengths[0])
+    matrix = np.frombuffer(
+        b"".join(encoded[i].ljust(width, b"\0") for i in order.tolist()),
+        dtype=np.uint8,
+    ).reshape(len(encoded), width)
+
+    active_counts = np.searchsorted(-sorted_lengths, -np.arange(width),
+                                    side="left")
+    sorted_hashes = np.zeros(len(encoded), dtype=np.uint64)
+    overflow = np.zeros(len(encoded), dtype=bool)
+    for j in range(width):
+        count = int(active_counts[j])
+        h = (sorted_hashes[:count] << np.uint64(4)) + matrix[:count, j]
+        overflow[:count] |= h > np.uint64(0xFFFFFFFF)
+        x = h & np.uint64(0xF0000000)
+        h ^= x >> np.uint64(24)
+        h &= ~x
+        sorted_hashes[:count] = h
+
+    for i in np.flatnonzero(overflow).tolist():
+        sorted_hashes[i] = elf_hash(encoded[order[i]].decode("latin-1"))
+    hashes[order] = sorted_hashes
+
+
+def elf_buckets(
+    keys: list[str | bytes], table_size: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Assigns every key to a bucket of a hash table with table_size slots.
+    Returns the bucket of each key and the number of keys per bucket,
+    which makes it quick to check how evenly the keys are spread.
+    >>> buckets, counts = elf_buckets(['lorem ipsum', 'abc', 'abd'], 4)
+    >>> buckets.tolist(), counts.tolist()
+    ([1, 3, 0], [1, 1, 0, 1])
+    >>> elf_buckets(['abc'], 0)
+    Traceback (most recent call last):
+    ...
+    ValueError: table_size must be positive
+    """
+    import numpy as np
+
+    if table_size <= 0:
+        raise ValueError("table_size must be positive")
+    buckets = elf_hash_many(keys) % np.uint64(table_size)
+    return buckets, np.bincount(buckets.astype(np.int64),
+                                minlength=table_size)
+
+
 if __name__ == "__main__":
     import doctest
 
@@ -7,6 +7,85 @@ code = []
 gear_one_pos = gear_two_pos = gear_three_pos = 0
 
 
+class EnigmaEngine:
+    """Enigma-like engine that keeps all of its state in the instance.
+    Gears are never rotated physically: the engine counts how many
+    characters it has processed and derives each gear's offset from that
+    counter, and the inverse permutation of every gear is precomputed,
+    so encoding a character is O(1). Independent engines can be used
+    side by side, one per session.
+    >>> EnigmaEngine(token=5).process("Hello World! 123")
+    'K,#!zi0tosy\\\\[HEB'
+    >>> EnigmaEngine(token=5).process('K,#!zi0tosy\\\\[HEB')
+    'Hello World! 123'
+    >>> engine = EnigmaEngine()
+    >>> engine.process("ab") + engine.process("c") == EnigmaEngine().process("abc")
+    True
+    >>> EnigmaEngine().process("~")
+    Traceback (most recent call last):
+    ...
+    ValueError: '~' is not in the alphabet
+    """  # noqa: E501
+
+    def __init__(
+        self,
+        token: int = 0,
+        gears: tuple[list[int], list[int], list[int]] | None = None,
+        reflector: list[int] | None = None,
+        alphabet: list[str] = alphabets,
+    ) -> None:
+        size = len(alphabet)
+        self.alphabet = "".join(alphabet)
+        self.index = {character: i for i, character in enumerate(alphabet)}
+        self.gears = tuple(
+            tuple(gear) for gear in (gears or [range(size)] * 3)
+        )
+        self.inverse_gears = tuple(
+            tuple(sorted(range(size), key=gear.__getitem__))
+            for gear in self.gears
+        )
+        self.reflector = tuple(
+            reflector if reflector is not None else reversed(range(size))
+        )
+        # number of characters processed, including the token's rotations
+        self.position = token
+
+    def rotate(self, steps: int = 1) -> None:
+        """Advances the gears as if steps characters had been processed."""
+        self.position += steps
+
+    def process(self, text: str) -> str:
+        """Encodes (or decodes) a whole string and advances the gears."""
+        size = len(self.alphabet)
+        index = self.index
+        alphabet = self.alphabet
+        gear_one, gear_two, gear_three = self.gears
+        inverse_one, inverse_two, inverse_three = self.inverse_gears
+        reflector = self.reflector
+        position = self.position
+        result = []
+        for character in text:
+            try:
+                target = index[character]
+            except KeyError:
+                raise ValueError(
+                    f"{character!r} is not in the alphabet") from None
+            one = position % size
+            two = position // size % size
+            three = position // (size * size) % size
+            target = gear_one[(target + one) % size]
+            target = gear_two[(target + two) % size]
+            target = gear_three[(target + three) % size]
+            target = reflector[target]
+            target = (inverse_three[target] - three) % size
+            target = (inverse_two[target] - two) % size
+            target = (inverse_one[target] - one) % size
+            result.append(alphabet[target])
+            position += 1
+        self.position = position
+        return "".join(result)
+
+
 def rotator():
     global gear_one_pos
     global gear_two_pos
@@ -41,18 +120,14 @@ def engine(input_character):
 
 
 if __name__ == "__main__":
-    decode = list(input("Type your message:\n"))
+    decode = input("Type your message:\n")
     while True:
         try:
             token = int(input("Please set token:(must be only digits)\n"))
             break
         except Exception as error:
             print(error)
-    for _ in range(token):
-        rotator()
-    for j in decode:
-        engine(j)
-    print("\n" + "".join(code))
+    print("\n" + EnigmaEngine(token).process(decode))
     print(
         f"\nYour Token is {token} please write it down.\nIf you want to decode"
         " this message again you should input same digits as token!"
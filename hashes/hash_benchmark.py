@@ -0,0 +1,208 @@
+"""
+Throughput benchmark for the hash implementations in this package,
+measured against the matching hashlib function (zlib.crc32 stands in for
+ELF hash, which has no stdlib equivalent).
+
+For every algorithm and message size it records MB/s, per-call latency
+percentiles and the peak memory allocated during one call (tracemalloc),
+and writes the results as JSON so runs from different commits can be
+diffed with --compare.
+
+Usage: python -m hashes.hash_benchmark --output before.json
+       python -m hashes.hash_benchmark --output after.json --compare before.json
+       python -m hashes.hash_benchmark --algorithms md5 --sizes 16 1024
+"""
+
+import argparse
+import hashlib
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+import zlib
+from collections.abc import Callable
+
+from .elf import elf_hash
+from .md5 import md5_me
+from .sha1 import SHA1Hash
+from .sha256 import SHA256
+
+# 16 B up to 64 MB
+DEFAULT_SIZES = (16, 256, 4096, 65536, 1 << 20, 16 << 20, 64 << 20)
+
+# Bytes hashed per measurement; small messages are repeated up to this
+DEFAULT_BUDGET = 1 << 20
+
+# Upper bound on the number of calls timed per measurement
+MAX_CALLS = 1000
+
+ALGORITHMS: dict[str, tuple[Callable, str, Callable]] = {
+    "sha256": (
+        lambda data: SHA256(data).hexdigest(),
+        "hashlib.sha256",
+        lambda data: hashlib.sha256(data).hexdigest(),
+    ),
+    "sha1": (
+        lambda data: SHA1Hash(data).final_hash(),
+        "hashlib.sha1",
+        lambda data: hashlib.sha1(data).hexdigest(),  # noqa: S324
+    ),
+    "md5": (
+        md5_me,
+        "hashlib.md5",
+        lambda data: hashlib.md5(data).hexdigest(),  # noqa: S324
+    ),
+    "elf": (
+        lambda data: elf_hash(data.decode("latin-1")),
+        "zlib.crc32",
+        zlib.crc32,
+    ),
+}
+
+
+def make_message(size: int) -> bytes:
+    """Deterministic message of the given size.
+    >>> make_message(5)
+    b'\\x00\\x01\\x02\\x03\\x04'
+    >>> len(make_message(1000))
+    1000
+    """
+    return (bytes(range(256)) * (size // 256 + 1))[:size]
+
+
+def measure(function: Callable, data: bytes, budget: int = DEFAULT_BUDGET
+            ) -> dict:
+    """Times repeated calls of function(data) and measures its peak memory.
+    >>> result = measure(len, b"abc", budget=30)
+    >>> result["calls"], sorted(result["latency_s"])
+    (10, ['p50', 'p90', 'p99'])
+    """
+    calls = max(1, min(MAX_CALLS, budget // max(1, len(data))))
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        function(data)
+        latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function(data)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        p50, p90, p99 = cuts[49], cuts[89], cuts[98]
+    else:
+        p50 = p90 = p99 = latencies[0]
+    total = sum(latencies)
+    return {
+        "calls": calls,
+        "mb_per_s": len(data) * calls / total / 1e6 if total else None,
+        "latency_s": {"p50": p50, "p90": p90, "p99": p99},
+        "peak_memory_bytes": peak,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(
+    algorithms: tuple[str, ...] = tuple(ALGORITHMS),
+    sizes: tuple[int, ...] = DEFAULT_SIZES,
+    budget: int = DEFAULT_BUDGET,
+) -> dict:
+    """Benchmarks the given algorithms and their reference functions.
+    >>> report = run(("md5",), (16,), budget=64)
+    >>> [(r["algorithm"], r["implementation"], r["size"])
+    ...  for r in report["results"]]
+    [('md5', 'pyalgos', 16), ('md5', 'hashlib.md5', 16)]
+    """
+    results = []
+    for name in algorithms:
+        ours, reference_name, reference = ALGORITHMS[name]
+        for size in sizes:
+            data = make_message(size)
+            for implementation, function in (("pyalgos", ours),
+                                             (reference_name, reference)):
+                results.append({
+                    "algorithm": name,
+                    "implementation": implementation,
+                    "size": size,
+                    **measure(function, data, budget),
+                })
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "budget": budget,
+        },
+        "results": results,
+    }
+
+
+def compare(old: dict, new: dict) -> list[tuple[str, str, int, float]]:
+    """Returns (algorithm, implementation, size, new/old MB/s) for every
+    measurement present in both reports.
+    >>> row = {"algorithm": "md5", "implementation": "pyalgos", "size": 16}
+    >>> compare({"results": [{**row, "mb_per_s": 2.0}]},
+    ...         {"results": [{**row, "mb_per_s": 3.0}]})
+    [('md5', 'pyalgos', 16, 1.5)]
+    """
+    def key(result: dict) -> tuple[str, str, int]:
+        return result["algorithm"], result["implementation"], result["size"]
+
+    previous = {key(result): result for result in old["results"]}
+    ratios = []
+    for result in new["results"]:
+        before = previous.get(key(result))
+        if before and before["mb_per_s"] and result["mb_per_s"]:
+            ratios.append((*key(result),
+                           result["mb_per_s"] / before["mb_per_s"]))
+    return ratios
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
+
+    parser = argparse.ArgumentParser(description="Benchmark hashes.*")
+    parser.add_argument("--algorithms", nargs="+", choices=list(ALGORITHMS),
+                        default=list(ALGORITHMS))
+    parser.add_argument("--sizes", nargs="+", type=int,
+                        default=list(DEFAULT_SIZES),
+                        help="Message sizes in bytes")
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET,
+                        help="Bytes hashed per measurement")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--compare", help="Earlier JSON report to diff with")
+    args = parser.parse_args()
+
+    report = run(tuple(args.algorithms), tuple(args.sizes), args.budget)
+    for result in report["results"]:
+        print(f'{result["algorithm"]:>7} {result["implementation"]:>15} '
+              f'{result["size"]:>10} B {result["mb_per_s"] or 0:12.3f} MB/s '
+              f'p50 {result["latency_s"]["p50"]:.6f} s '
+              f'peak {result["peak_memory_bytes"]} B')
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            for name, implementation, size, ratio in compare(json.load(f),
+                                                             report):
+                print(f"{name:>7} {implementation:>15} {size:>10} B "
+                      f"x{ratio:.2f}")
@@ -11,32 +11,33 @@ Reference: https://en.wikipedia.org/wiki/MD5
 """
 
 
-from collections.abc import Generator
+import struct
+from collections.abc import Generator, Iterable
 from math import sin
 
+from .sha256 import _feed_file, _hash_many
 
-def to_little_endian(string_32: bytes) -> bytes:
-    """Converts the given string to little-endian in groups of 8 chars.
-    Arguments:
-        string_32 {[string]} -- [32-char string]
-    Raises:
-        ValueError -- [input is not 32 char]
-    Returns:
-        32-char little-endian string
-    >>> to_little_endian(b'1234567890abcdfghijklmnopqrstuvw')
-    b'pqrstuvwhijklmno90abcdfg12345678'
-    >>> to_little_endian(b'1234567890')
-    Traceback (most recent call last):
-    ...
-    ValueError: Input must be of length 32
-    """
-    if len(string_32) != 32:
-        raise ValueError("Input must be of length 32")
+# Starting states a0, b0, c0, d0
+INITIAL_STATE = (0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476)
 
-    little_endian = b""
-    for i in [3, 2, 1, 0]:
-        little_endian += string_32[8 * i: 8 * i + 8]
-    return little_endian
+# Per-round additive constants: floor(2**32 * abs(sin(i + 1)))
+ADDED_CONSTS = tuple(int(2**32 * abs(sin(i + 1))) for i in range(64))
+
+# Per-round shift amounts, four rounds of 16 operations each
+SHIFT_AMOUNTS = (
+    (7, 12, 17, 22) * 4 + (5, 9, 14, 20) * 4
+    + (4, 11, 16, 23) * 4 + (6, 10, 15, 21) * 4
+)
+
+# Index of the message word used by each of the 64 operations
+WORD_ORDER = (
+    tuple(range(16))
+    + tuple((5 * i + 1) % 16 for i in range(16, 32))
+    + tuple((3 * i + 5) % 16 for i in range(32, 48))
+    + tuple((7 * i) % 16 for i in range(48, 64))
+)
+
+_BLOCK_WORDS = struct.Struct("<16I")
 
 
 def reformat_hex(i: int) -> bytes:
@@ -77,90 +78,79 @@ def reformat_hex(i: int) -> bytes:
 
 
 def preprocess(message: bytes) -> bytes:
-    """Preprocesses the message string:
-    - Convert message to bit string
-    - Pad bit string to a multiple of 512 chars:
-        - Append a 1
-        - Append 0's until length = 448 (mod 512)
-        - Append length of original message (64 chars)
+    """Preprocesses the message:
+    Pad message to a multiple of 64 bytes (512 bits):
+        - Append the byte 0x80 (a 1 bit followed by seven 0 bits)
+        - Append 0x00 bytes until length = 56 (mod 64)
+        - Append length of original message in bits
+          as a 64-bit little-endian integer
     Example: Suppose the input is the following:
-        message = "a"
-        The message bit string is "01100001", which is 8 bits long. Thus, the
-        bit string needs 439 bits of padding so that
-        (bit_string + "1" + padding) = 448 (mod 512).
-        The message length is "000010000...0" in 64-bit little-endian binary.
-        The combined bit string is then 512 bits long.
+        message = b"a"
+        The message is 1 byte long, so 0x80 and 54 zero bytes bring it
+        to 56 bytes. The bit length 8 is then appended as
+        b"\\x08\\x00\\x00\\x00\\x00\\x00\\x00\\x00",
+        which makes a single 64 byte block.
     Arguments:
-        message {[string]} -- [message string]
+        message {[bytes]} -- [message]
     Returns:
-        processed bit string padded to a multiple of 512 chars
-    >>> preprocess(b"a") == (b"01100001" + b"1" +
-    ...                     (b"0" * 439) + b"00001000" + (b"0" * 56))
+        message padded to a multiple of 64 bytes
+    >>> preprocess(b"a") == b"a" + b"\\x80" + bytes(54) + b"\\x08" + bytes(7)
     True
-    >>> preprocess(b"") == b"1" + (b"0" * 447) + (b"0" * 64)
+    >>> preprocess(b"") == b"\\x80" + bytes(63)
     True
+    >>> len(preprocess(b"x" * 56))
+    128
     """
-    bit_string = b""
-    for char in message:
-        bit_string += format(char, "08b").encode("utf-8")
-    start_len = format(len(bit_string), "064b").encode("utf-8")
+    return bytes(message) + padding(len(message))
 
-    # Pad bit_string to a multiple of 512 chars
-    bit_string += b"1"
-    while len(bit_string) % 512 != 448:
-        bit_string += b"0"
-    bit_string += to_little_endian(start_len[32:]) + \
-        to_little_endian(start_len[:32])
 
-    return bit_string
+def padding(length: int) -> bytes:
+    """Returns the padding for a message of the given length in bytes.
+    Arguments:
+        length {[int]} -- [message length in bytes]
+    Returns:
+        the bytes that preprocess() appends to such a message
+    >>> padding(3)[:2], len(padding(3)), padding(3)[-8:]
+    (b'\\x80\\x00', 61, b'\\x18\\x00\\x00\\x00\\x00\\x00\\x00\\x00')
+    """
+    return (b"\x80" + b"\x00" * (63 - (length + 8) % 64)
+            + struct.pack("<Q", (length * 8) % 2**64))
 
 
-def get_block_words(bit_string: bytes) -> Generator[list[int], None, None]:
-    """Splits bit string into blocks of 512 chars and
-    yields each block as a list of 32-bit words.
+def get_block_words(data: bytes) -> Generator[list[int], None, None]:
+    """Splits data into blocks of 64 bytes and
+    yields each block as a list of 16 little-endian 32-bit words.
     Example: Suppose the input is the following:
-        bit_string =
-            "000000000...0" +  # 0x00 (32 bits, padded to the right)
-            "000000010...0" +  # 0x01 (32 bits, padded to the right)
-            "000000100...0" +  # 0x02 (32 bits, padded to the right)
-            "000000110...0" +  # 0x03 (32 bits, padded to the right)
-            ...
-            "000011110...0"    # 0x0a (32 bits, padded to the right)
-        Then len(bit_string) == 512, so there'll be 1 block. The block is split
-        into 32-bit words, and each word is converted to little endian. The
-        first word is interpreted as 0 in decimal, the second word is
-        interpreted as 1 in decimal, etc.
+        data = b"\\x00\\x00\\x00\\x00" + b"\\x01\\x00\\x00\\x00" + ...
+        Then len(data) == 64, so there'll be 1 block. Each group of
+        4 bytes is read as a little-endian word, so the first word is 0,
+        the second word is 1, etc.
         Thus, block_words == [[0, 1, 2, 3, ..., 15]].
     Arguments:
-        bit_string {[string]} -- [bit string with multiple of 512 as length]
+        data {[bytes]} -- [bytes with multiple of 64 as length]
     Raises:
-        ValueError -- [length of bit string isn't multiple of 512]
+        ValueError -- [length of data isn't multiple of 64]
     Yields:
         a list of 16 32-bit words
-    >>> test_string = ("".join(format(n << 24, "032b") for n in range(16))
-    ...                  .encode("utf-8"))
-    >>> list(get_block_words(test_string))
+    >>> test_data = b"".join(n.to_bytes(4, "little") for n in range(16))
+    >>> list(get_block_words(test_data))
     [[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15]]
-    >>> list(get_block_words(test_string * 4)) == [list(range(16))] * 4
+    >>> list(get_block_words(test_data * 4)) == [list(range(16))] * 4
     True
-    >>> list(get_block_words(b"1" * 512)) == [[4294967295] * 16]
+    >>> list(get_block_words(b"\\xff" * 64)) == [[4294967295] * 16]
     True
     >>> list(get_block_words(b""))
     []
     >>> list(get_block_words(b"1111"))
     Traceback (most recent call last):
     ...
-    ValueError: Input must have length that's a multiple of 512
+    ValueError: Input must have length that's a multiple of 64
     """
-    if len(bit_string) % 512 != 0:
-        raise ValueError("Input must have length that's a multiple of 512")
+    if len(data) % 64 != 0:
+        raise ValueError("Input must have length that's a multiple of 64")
 
-    for pos in range(0, len(bit_string), 512):
-        block = bit_string[pos: pos + 512]
-        block_words = []
-        for i in range(0, 512, 32):
-            block_words.append(int(to_little_endian(block[i: i + 32]), 2))
-        yield block_words
+    for pos in range(0, len(data), 64):
+        yield list(_BLOCK_WORDS.unpack_from(data, pos))
 
 
 def not_32(i: int) -> int:
@@ -189,11 +179,7 @@ def not_32(i: int) -> int:
     if i < 0:
         raise ValueError("Input must be non-negative")
 
-    i_str = format(i, "032b")
-    new_str = ""
-    for c in i_str:
-        new_str += "1" if c == "0" else "0"
-    return int(new_str, 2)
+    return i ^ 0xFFFFFFFF
 
 
 def sum_32(a: int, b: int) -> int:
@@ -256,6 +242,59 @@ def left_rotate_32(i: int, shift: int) -> int:
     return ((i << shift) ^ (i >> (32 - shift))) % 2**32
 
 
+def compress_block(
+    state: tuple[int, int, int, int],
+    data: bytes,
+    offset: int = 0,
+    _k: tuple[int, ...] = ADDED_CONSTS,
+    _s: tuple[int, ...] = SHIFT_AMOUNTS,
+    _g: tuple[int, ...] = WORD_ORDER,
+    _unpack_from=_BLOCK_WORDS.unpack_from,
+) -> tuple[int, int, int, int]:
+    """Hashes the 64 byte block at data[offset:offset + 64] into the state.
+    The four rounds are written as separate loops so that no branch is
+    taken per operation; WORD_ORDER gives the message word of each step.
+    Arguments:
+        state {[tuple]} -- [current (a0, b0, c0, d0)]
+        data {[bytes]} -- [buffer holding the block]
+        offset {[int]} -- [start of the block in data]
+    Returns:
+        the new (a0, b0, c0, d0)
+    >>> compress_block(INITIAL_STATE, preprocess(b""))[0] == 0xD98C1DD4
+    True
+    """
+    x = _unpack_from(data, offset)
+    a, b, c, d = state
+
+    for i in range(16):
+        f = (d ^ (b & (c ^ d))) + a + _k[i] + x[i] & 0xFFFFFFFF
+        s = _s[i]
+        a, d, c = d, c, b
+        b = b + ((f << s) | (f >> (32 - s))) & 0xFFFFFFFF
+    for i in range(16, 32):
+        f = (c ^ (d & (b ^ c))) + a + _k[i] + x[_g[i]] & 0xFFFFFFFF
+        s = _s[i]
+        a, d, c = d, c, b
+        b = b + ((f << s) | (f >> (32 - s))) & 0xFFFFFFFF
+    for i in range(32, 48):
+        f = (b ^ c ^ d) + a + _k[i] + x[_g[i]] & 0xFFFFFFFF
+        s = _s[i]
+        a, d, c = d, c, b
+        b = b + ((f << s) | (f >> (32 - s))) & 0xFFFFFFFF
+    for i in range(48, 64):
+        f = (c ^ (b | (d ^ 0xFFFFFFFF))) + a + _k[i] + x[_g[i]] & 0xFFFFFFFF
+        s = _s[i]
+        a, d, c = d, c, b
+        b = b + ((f << s) | (f >> (32 - s))) & 0xFFFFFFFF
+
+    return (
+        state[0] + a & 0xFFFFFFFF,
+        state[1] + b & 0xFFFFFFFF,
+        state[2] + c & 0xFFFFFFFF,
+        state[3] + d & 0xFFFFFFFF,
+    )
+
+
 def md5_me(message: bytes) -> bytes:
     """Returns the 32-char MD5 hash of a given message.
     Reference: https://en.wikipedia.org/wiki/MD5#Algorithm
@@ -277,122 +316,123 @@ def md5_me(message: bytes) -> bytes:
     True
     """  # noqa: E501
 
-    # Convert to bit string, add padding and append message length
-    bit_string = preprocess(message)
-
-    added_consts = [int(2**32 * abs(sin(i + 1))) for i in range(64)]
-
-    # Starting states
-    a0 = 0x67452301
-    b0 = 0xEFCDAB89
-    c0 = 0x98BADCFE
-    d0 = 0x10325476
-
-    shift_amounts = [
-        7,
-        12,
-        17,
-        22,
-        7,
-        12,
-        17,
-        22,
-        7,
-        12,
-        17,
-        22,
-        7,
-        12,
-        17,
-        22,
-        5,
-        9,
-        14,
-        20,
-        5,
-        9,
-        14,
-        20,
-        5,
-        9,
-        14,
-        20,
-        5,
-        9,
-        14,
-        20,
-        4,
-        11,
-        16,
-        23,
-        4,
-        11,
-        16,
-        23,
-        4,
-        11,
-        16,
-        23,
-        4,
-        11,
-        16,
-        23,
-        6,
-        10,
-        15,
-        21,
-        6,
-        10,
-        15,
-        21,
-        6,
-        10,
-        15,
-        21,
-        6,
-        10,
-        15,
-        21,
-    ]
-
-    # Process bit string in chunks, each with 16 32-char words
-    for block_words in get_block_words(bit_string):
-        a = a0
-        b = b0
-        c = c0
-        d = d0
-
-        # Hash current chunk
-        for i in range(64):
-            if i <= 15:
-                # f = (b & c) | (not_32(b) & d)     # Alternate definition for f  # noqa: E501
-                f = d ^ (b & (c ^ d))
-                g = i
-            elif i <= 31:
-                # f = (d & b) | (not_32(d) & c)     # Alternate definition for f  # noqa: E501
-                f = c ^ (d & (b ^ c))
-                g = (5 * i + 1) % 16
-            elif i <= 47:
-                f = b ^ c ^ d
-                g = (3 * i + 5) % 16
-            else:
-                f = c ^ (b | not_32(d))
-                g = (7 * i) % 16
-            f = (f + a + added_consts[i] + block_words[g]) % 2**32
-            a = d
-            d = c
-            c = b
-            b = sum_32(b, left_rotate_32(f, shift_amounts[i]))
-
-        # Add hashed chunk to running total
-        a0 = sum_32(a0, a)
-        b0 = sum_32(b0, b)
-        c0 = sum_32(c0, c)
-        d0 = sum_32(d0, d)
-
-    digest = reformat_hex(a0) + reformat_hex(b0) + \
-        reformat_hex(c0) + reformat_hex(d0)
-    return digest
+    state = INITIAL_STATE
+    length = len(message)
+    full = length - length % 64
+
+    # Process the whole blocks straight from the message,
+    # then the last partial block together with the padding
+    for offset in range(0, full, 64):
+        state = compress_block(state, message, offset)
+    tail = bytes(message[full:]) + padding(length)
+    for offset in range(0, len(tail), 64):
+        state = compress_block(state, tail, offset)
+
+    return b"".join(reformat_hex(word) for word in state)
+
+
+class MD5:
+    """Incremental MD5 hasher in the style of the hashlib objects.
+    Only the four state words and an unprocessed tail of less than
+    64 bytes are kept between update() calls.
+    >>> hasher = MD5(b"The quick brown fox ")
+    >>> hasher.update(b"jumps over the lazy dog")
+    >>> hasher.hexdigest()
+    '9e107d9d372bb6826bd81d3542a419d6'
+    >>> hasher.digest() == bytes.fromhex(hasher.hexdigest())
+    True
+    >>> clone = hasher.copy()
+    >>> clone.update(b".")
+    >>> clone.hexdigest() == md5_me(b"The quick brown fox jumps over the lazy dog.").decode()
+    True
+    >>> hasher.hexdigest()
+    '9e107d9d372bb6826bd81d3542a419d6'
+    """  # noqa: E501
+
+    def __init__(self, data: bytes = b"") -> None:
+        self.state = INITIAL_STATE
+        self._buffer = b""
+        self._length = 0
+        self.update(data)
+
+    def update(self, data: bytes) -> None:
+        """Feeds more bytes into the hash."""
+        data = memoryview(data).cast("B")
+        self._length += len(data)
+        position = 0
+        if self._buffer:
+            position = 64 - len(self._buffer)
+            self._buffer += data[:position]
+            if len(self._buffer) < 64:
+                return
+            self.state = compress_block(self.state, self._buffer)
+        end = position + (len(data) - position) // 64 * 64
+        state = self.state
+        for offset in range(position, end, 64):
+            state = compress_block(state, data, offset)
+        self.state = state
+        self._buffer = bytes(data[end:])
+
+    def copy(self) -> "MD5":
+        """Returns an independent copy of the hashing state."""
+        clone = MD5.__new__(MD5)
+        clone.state = self.state
+        clone._buffer = self._buffer
+        clone._length = self._length
+        return clone
+
+    def digest(self) -> bytes:
+        """Returns the 16 byte digest; the object can still be updated."""
+        tail = self._buffer + padding(self._length)
+        state = self.state
+        for offset in range(0, len(tail), 64):
+            state = compress_block(state, tail, offset)
+        return struct.pack("<4I", *state)
+
+    def hexdigest(self) -> str:
+        return self.digest().hex()
+
+
+def md5_file(source) -> bytes:
+    """Returns the 32-char MD5 hash of a file.
+    Arguments:
+        source {[path or file]} -- [path, or file object opened in binary mode]
+    Returns:
+        32-char MD5 hash string, like md5_me
+    >>> import hashlib, io, tempfile
+    >>> data = b"The quick brown fox jumps over the lazy dog" * 1000
+    >>> with tempfile.NamedTemporaryFile() as f:
+    ...     _ = f.write(data)
+    ...     f.flush()
+    ...     md5_file(f.name) == hashlib.md5(data).hexdigest().encode()
+    True
+    >>> md5_file(io.BytesIO(b"")) == md5_me(b"")
+    True
+    """
+    hasher = MD5()
+    _feed_file(source, hasher.update)
+    return hasher.hexdigest().encode("utf-8")
+
+
+def md5_many(
+    messages: Iterable[bytes], processes: int | None = None,
+    chunksize: int = 512
+) -> list[bytes]:
+    """Returns the MD5 hashes of many messages in input order.
+    The round tables are module constants shared by every call, and
+    with processes > 1 the messages are hashed in a process pool.
+    Arguments:
+        messages {[iterable]} -- [messages to hash]
+        processes {[int]} -- [number of worker processes, default None]
+        chunksize {[int]} -- [messages sent to a worker at a time]
+    Returns:
+        list of 32-char MD5 hashes, one per message
+    >>> md5_many([b"", b"The quick brown fox jumps over the lazy dog"])
+    [b'd41d8cd98f00b204e9800998ecf8427e', b'9e107d9d372bb6826bd81d3542a419d6']
+    >>> md5_many([b"a", b"b"], processes=2) == md5_many([b"a", b"b"])
+    True
+    """
+    return _hash_many(md5_me, messages, processes, chunksize)
 
 
 if __name__ == "__main__":
@@ -2,8 +2,8 @@
 Implementation of the SHA1 hash function in a Python class.
 Provides utilities for finding a string hash or text hash from a file.
 
-Usage: python sha1.py --string "Hello World!!"
-       python sha1.py --file "hello_world.txt"
+Usage: python -m hashes.sha1 --string "Hello World!!"
+       python -m hashes.sha1 --file "hello_world.txt"
        When run without any arguments, it prints the hash of the string
        "Hello World!! Welcome to Cryptography"
 
@@ -29,22 +29,116 @@ Reference: https://deadhacker.com/2006/02/21/sha-1-illustrated/
 import argparse
 import hashlib  # hashlib is only used inside the Test class
 import struct
+from functools import partial
+
+from .sha256 import _feed_file, _hash_many, _hexdigest, _padding
+
+INITIAL_H = (0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476, 0xC3D2E1F0)
+
+_BLOCK_WORDS = struct.Struct(">16L")
+
+# Layout of an exported SHA1Hash state: magic, version, h0..h4 and
+# the byte count, followed by the partial block
+_STATE = struct.Struct(">4sB5IQ")
+_STATE_MAGIC = b"SHA1"
+_STATE_VERSION = 1
+
+
+def expand_block(data, offset=0, _unpack_from=_BLOCK_WORDS.unpack_from):
+    """Returns the 80-word message schedule of the 64 byte block at
+    data[offset:offset + 64].
+    >>> w = expand_block(b"\\x80" + bytes(63))
+    >>> len(w), w[16]
+    (80, 1)
+    """
+    w = list(_unpack_from(data, offset))
+    for i in range(16, 80):
+        x = w[i - 3] ^ w[i - 8] ^ w[i - 14] ^ w[i - 16]
+        w.append(((x << 1) | (x >> 31)) & 0xFFFFFFFF)
+    return w
+
+
+def compress_block(h, data, offset=0):
+    """Expands and compresses the 64 byte block at data[offset:offset + 64]
+    and returns the updated 5-tuple of h-words.
+    Works on plain local variables so that it can be shared by SHA1Hash
+    and the batch helper without any per-message setup.
+    >>> compress_block(INITIAL_H, b"\\x80" + bytes(63))[0] == 0xDA39A3EE
+    True
+    """
+    w = expand_block(data, offset)
+
+    a, b, c, d, e = h
+    for i in range(0, 20):
+        a, b, c, d, e = (
+            (((a << 5) | (a >> 27)) + (d ^ (b & (c ^ d))) + e + 0x5A827999
+             + w[i]) & 0xFFFFFFFF,
+            a,
+            ((b << 30) | (b >> 2)) & 0xFFFFFFFF,
+            c,
+            d,
+        )
+    for i in range(20, 40):
+        a, b, c, d, e = (
+            (((a << 5) | (a >> 27)) + (b ^ c ^ d) + e + 0x6ED9EBA1
+             + w[i]) & 0xFFFFFFFF,
+            a,
+            ((b << 30) | (b >> 2)) & 0xFFFFFFFF,
+            c,
+            d,
+        )
+    for i in range(40, 60):
+        a, b, c, d, e = (
+            (((a << 5) | (a >> 27)) + ((b & c) | (d & (b | c))) + e
+             + 0x8F1BBCDC + w[i]) & 0xFFFFFFFF,
+            a,
+            ((b << 30) | (b >> 2)) & 0xFFFFFFFF,
+            c,
+            d,
+        )
+    for i in range(60, 80):
+        a, b, c, d, e = (
+            (((a << 5) | (a >> 27)) + (b ^ c ^ d) + e + 0xCA62C1D6
+             + w[i]) & 0xFFFFFFFF,
+            a,
+            ((b << 30) | (b >> 2)) & 0xFFFFFFFF,
+            c,
+            d,
+        )
+    return (
+        h[0] + a & 0xFFFFFFFF,
+        h[1] + b & 0xFFFFFFFF,
+        h[2] + c & 0xFFFFFFFF,
+        h[3] + d & 0xFFFFFFFF,
+        h[4] + e & 0xFFFFFFFF,
+    )
 
 
 class SHA1Hash:
     """Class to contain the entire pipeline for SHA1 Hashing Algorithm.
+    Data can also be fed in parts with update(), and the intermediate
+    state can be saved with export_state() and resumed elsewhere
+    with SHA1Hash.from_state().
     >>> SHA1Hash(bytes('Allan', 'utf-8')).final_hash()
     '872af2d8ac3d8695387e7c804bf0e02c18df9e6e'
+    >>> first = SHA1Hash(b'Al')
+    >>> resumed = SHA1Hash.from_state(first.export_state())
+    >>> resumed.update(b'lan')
+    >>> resumed.final_hash()
+    '872af2d8ac3d8695387e7c804bf0e02c18df9e6e'
     """
 
-    def __init__(self, data):
-        """Initializes the variables data and h.
+    def __init__(self, data=b""):
+        """Initializes the variables h, the byte count and the partial block.
         h is a list of 5 8-digit hexadecimal numbers corresponding to
         (1732584193, 4023233417, 2562383102, 271733878, 3285377520)
         respectively. 0x - Writing hexadecimal numbers in Python.
         """
-        self.data = data
-        self.h = [0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476, 0xC3D2E1F0]
+        self.h = INITIAL_H
+        self.length = 0
+        self.partial_block = b""
+        if data:
+            self.update(data)
 
     @staticmethod
     def rotate(n, b):
@@ -55,81 +149,116 @@ class SHA1Hash:
         """
         return ((n << b) | (n >> (32 - b))) & 0xFFFFFFFF
 
-    def padding(self):
-        """Pads the input message with zeros
-        so that padded_data has 64 bytes or 512 bits.
-        """
-        padding = b"\x80" + b"\x00" * (63 - (len(self.data) + 8) % 64)
-        padded_data = self.data + padding + struct.pack(">Q",
-                                                        8 * len(self.data))
-        return padded_data
-
-    def split_blocks(self):
-        """Returns a list of bytestrings each of length 64.
-        """
-        return [
-            self.padded_data[i: i + 64] for i in range(0,
-                                                       len(self.padded_data),
-                                                       64)
-        ]
-
-    # @staticmethod
-    def expand_block(self, block):
+    @staticmethod
+    def expand_block(block):
         """Unpack a block of byte strings of length 64
         into a list of integers and returns a list of
         80 integers after some bitwise operations.
+        Same schedule as the module-level expand_block used by
+        compress_block.
+        """
+        return expand_block(block)
+
+    def update(self, data):
+        """Hashes every whole 64 byte block that data completes and keeps
+        the remainder (less than one block) as the partial block.
         """
-        w = list(struct.unpack(">16L", block)) + [0] * 64
-        for i in range(16, 80):
-            w[i] = self.rotate((w[i - 3] ^ w[i - 8] ^ w[i - 14] ^ w[i - 16]),
-                               1)
-        return w
+        data = memoryview(data).cast("B")
+        self.length += len(data)
+        position = 0
+        if self.partial_block:
+            position = 64 - len(self.partial_block)
+            self.partial_block += data[:position]
+            if len(self.partial_block) < 64:
+                return
+            self.h = compress_block(self.h, self.partial_block)
+        end = position + (len(data) - position) // 64 * 64
+        h = self.h
+        for offset in range(position, end, 64):
+            h = compress_block(h, data, offset)
+        self.h = h
+        self.partial_block = bytes(data[end:])
 
     def final_hash(self):
-        """Calls all other methods to process the input data.
-        Compacts the data, then splits it into blocks, and then
-        performs a series of operations for each block (including expansion).
-        For each block, the variable h that was initialized is copied to
-        a, b, c, d, e and these 5 variables a,b,c,d,e undergo several changes.
+        """Pads the data seen so far and processes the last block(s).
+        For each block, the variable h is copied to a, b, c, d, e and
+        these 5 variables a,b,c,d,e undergo several changes.
         After all the blocks are processed,
         these 5 variables are added to h in pairs,
         i.e. a to h[0], b to h[1] and so on.
         This h becomes our final hash, which is returned.
+        The object itself is left unchanged, so more data can be added.
+        """
+        h = self.h
+        tail = self.partial_block + _padding(self.length)
+        for offset in range(0, len(tail), 64):
+            h = compress_block(h, tail, offset)
+        return ("{:08x}" * 5).format(*h)
+
+    def export_state(self):
+        """Serializes the five h-words, the byte count and the partial block.
+        >>> state = SHA1Hash(b'x' * 70).export_state()
+        >>> len(state), state[:5]
+        (39, b'SHA1\\x01')
+        """
+        return _STATE.pack(_STATE_MAGIC, _STATE_VERSION, *self.h,
+                           self.length) + self.partial_block
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuilds a hasher from the output of export_state().
+        >>> SHA1Hash.from_state(b'SHA1')
+        Traceback (most recent call last):
+        ...
+        ValueError: Not a SHA1Hash state
+        >>> SHA1Hash.from_state(SHA1Hash(b'abc').export_state()[:-1])
+        Traceback (most recent call last):
+        ...
+        ValueError: Partial block does not match the byte count
         """
-        self.padded_data = self.padding()
-        self.blocks = self.split_blocks()
-        for block in self.blocks:
-            expanded_block = self.expand_block(block)
-            a, b, c, d, e = self.h
-            for i in range(0, 80):
-                if 0 <= i < 20:
-                    f = (b & c) | ((~b) & d)
-                    k = 0x5A827999
-                elif 20 <= i < 40:
-                    f = b ^ c ^ d
-                    k = 0x6ED9EBA1
-                elif 40 <= i < 60:
-                    f = (b & c) | (b & d) | (c & d)
-                    k = 0x8F1BBCDC
-                elif 60 <= i < 80:
-                    f = b ^ c ^ d
-                    k = 0xCA62C1D6
-                a, b, c, d, e = (
-                    self.rotate(a, 5) + f + e + k +
-                    + expanded_block[i] & 0xFFFFFFFF,
-                    a,
-                    self.rotate(b, 30),
-                    c,
-                    d,
-                )
-            self.h = (
-                self.h[0] + a & 0xFFFFFFFF,
-                self.h[1] + b & 0xFFFFFFFF,
-                self.h[2] + c & 0xFFFFFFFF,
-                self.h[3] + d & 0xFFFFFFFF,
-                self.h[4] + e & 0xFFFFFFFF,
-            )
-        return ("{:08x}" * 5).format(*self.h)
+        if len(state) < _STATE.size or state[:4] != _STATE_MAGIC:
+            raise ValueError("Not a SHA1Hash state")
+        magic, version, *h, length = _STATE.unpack_from(state)
+        if version != _STATE_VERSION:
+            raise ValueError(f"Unsupported state version {version}")
+        partial_block = bytes(state[_STATE.size:])
+        if len(partial_block) != length % 64:
+            raise ValueError("Partial block does not match the byte count")
+        hasher = cls()
+        hasher.h = tuple(h)
+        hasher.length = length
+        hasher.partial_block = partial_block
+        return hasher
+
+
+def sha1_many(messages, processes=None, chunksize=512):
+    """Hashes every message of an iterable and returns the hex digests
+    in the same order. No SHA1Hash objects are built; padding is cached
+    per message length. Large batches can be spread over a process pool
+    by passing processes > 1.
+    >>> msgs = [b'', b'Allan', bytes(200)]
+    >>> sha1_many(msgs) == [hashlib.sha1(m).hexdigest() for m in msgs]
+    True
+    >>> sha1_many(msgs, processes=2) == sha1_many(msgs)
+    True
+    """
+    hexdigest = partial(_hexdigest, compress=compress_block,
+                        initial=INITIAL_H)
+    return _hash_many(hexdigest, messages, processes, chunksize)
+
+
+def sha1_file(source):
+    """Returns the SHA1 hex digest of a file, given as a path or a binary
+    file object, feeding the mapped file to SHA1Hash.update() so that
+    whole blocks never get copied.
+    >>> import io
+    >>> data = b"Allan" * 10000
+    >>> sha1_file(io.BytesIO(data)) == hashlib.sha1(data).hexdigest()
+    True
+    """
+    hasher = SHA1Hash()
+    _feed_file(source, hasher.update)
+    return hasher.final_hash()
 
 
 def test_sha1_hash():
@@ -137,6 +266,15 @@ def test_sha1_hash():
     assert SHA1Hash(msg).final_hash() == hashlib.sha1(msg).hexdigest()  # noqa: S324, E501
 
 
+def test_sha1_resume():
+    msg = bytes(range(256)) * 3
+    for split in (0, 1, 63, 64, 65, 500, len(msg)):
+        first = SHA1Hash(msg[:split])
+        resumed = SHA1Hash.from_state(first.export_state())
+        resumed.update(msg[split:])
+        assert resumed.final_hash() == hashlib.sha1(msg).hexdigest()  # noqa: S324, E501
+
+
 if __name__ == "__main__":
     import doctest
 
@@ -158,8 +296,6 @@ if __name__ == "__main__":
     input_string = args.input_string
     # In any case hash input should be a bytestring
     if args.input_file:
-        with open(args.input_file, "rb") as f:
-            hash_input = f.read()
+        print(sha1_file(args.input_file))
     else:
-        hash_input = bytes(input_string, "utf-8")
-    print(SHA1Hash(hash_input).final_hash())
+        print(SHA1Hash(bytes(input_string, "utf-8")).final_hash())
@@ -3,6 +3,8 @@ Implementation of SHA256 Hash function in a Python class and provides utilities
 to find hash of string or hash of text from a file.
 Usage: python sha256.py --string "Hello World!!"
        python sha256.py --file "hello_world.txt"
+       python sha256.py --benchmark 1 64 512
+       python sha256.py --file "big.bin" --tree --manifest "big.json"
        When run without any arguments,
        it prints the hash of the string "Hello World!! Welcome to Cryptography"
 
@@ -12,181 +14,510 @@ References:
 """
 
 import argparse
+import io
+import json
+import mmap
+import os
+import stat
 import struct
+import time
 import unittest
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import TypeVar
+
+# Initial hash values: first 32 bits of the fractional parts
+# of the square roots of the first 8 primes
+INITIAL_HASHES = (
+    0x6A09E667, 0xBB67AE85, 0x3C6EF372, 0xA54FF53A,
+    0x510E527F, 0x9B05688C, 0x1F83D9AB, 0x5BE0CD19,
+)
+
+# Round constants: first 32 bits of the fractional parts
+# of the cube roots of the first 64 primes
+ROUND_CONSTANTS = (
+    0x428A2F98, 0x71374491, 0xB5C0FBCF, 0xE9B5DBA5,
+    0x3956C25B, 0x59F111F1, 0x923F82A4, 0xAB1C5ED5,
+    0xD807AA98, 0x12835B01, 0x243185BE, 0x550C7DC3,
+    0x72BE5D74, 0x80DEB1FE, 0x9BDC06A7, 0xC19BF174,
+    0xE49B69C1, 0xEFBE4786, 0x0FC19DC6, 0x240CA1CC,
+    0x2DE92C6F, 0x4A7484AA, 0x5CB0A9DC, 0x76F988DA,
+    0x983E5152, 0xA831C66D, 0xB00327C8, 0xBF597FC7,
+    0xC6E00BF3, 0xD5A79147, 0x06CA6351, 0x14292967,
+    0x27B70A85, 0x2E1B2138, 0x4D2C6DFC, 0x53380D13,
+    0x650A7354, 0x766A0ABB, 0x81C2C92E, 0x92722C85,
+    0xA2BFE8A1, 0xA81A664B, 0xC24B8B70, 0xC76C51A3,
+    0xD192E819, 0xD6990624, 0xF40E3585, 0x106AA070,
+    0x19A4C116, 0x1E376C08, 0x2748774C, 0x34B0BCB5,
+    0x391C0CB3, 0x4ED8AA4A, 0x5B9CCA4F, 0x682E6FF3,
+    0x748F82EE, 0x78A5636F, 0x84C87814, 0x8CC70208,
+    0x90BEFFFA, 0xA4506CEB, 0xBEF9A3F7, 0xC67178F2,
+)
+
+_BLOCK_WORDS = struct.Struct(">16L")
+
+# Chunk size used by the Merkle tree mode
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Bytes of a file mapped into memory at a time, a multiple of
+# the mmap allocation granularity on common platforms
+FILE_WINDOW = 1 << 20
+
+
+def compress_block(
+    hashes: tuple[int, ...],
+    data: bytes,
+    offset: int = 0,
+    _k: tuple[int, ...] = ROUND_CONSTANTS,
+    _unpack_from=_BLOCK_WORDS.unpack_from,
+) -> tuple[int, ...]:
+    """Runs the SHA256 compression function over the 64 byte block found
+    at data[offset:offset + 64] and returns the new hash values.
+    Rotations are written inline and the constants are bound as default
+    arguments so that the inner loops only touch local variables.
+    The high bits left behind by the unmasked left shifts do not affect
+    the low 32 bits of the sums, so masking is done once per value.
+    >>> block = SHA256.padding(0)
+    >>> compress_block(INITIAL_HASHES, block)[0] == 0xE3B0C442
+    True
+    """
+    w = list(_unpack_from(data, offset))
+
+    # Message schedule, fully expanded before the rounds start
+    for i in range(16, 64):
+        x = w[i - 15]
+        y = w[i - 2]
+        w.append(
+            (
+                w[i - 16]
+                + w[i - 7]
+                + (((x >> 7) | (x << 25)) ^ ((x >> 18) | (x << 14))
+                   ^ (x >> 3))
+                + (((y >> 17) | (y << 15)) ^ ((y >> 19) | (y << 13))
+                   ^ (y >> 10))
+            )
+            & 0xFFFFFFFF
+        )
+
+    a, b, c, d, e, f, g, h = hashes
+
+    for k_i, w_i in zip(_k, w):
+        temp1 = (
+            h
+            + (((e >> 6) | (e << 26)) ^ ((e >> 11) | (e << 21))
+               ^ ((e >> 25) | (e << 7)))
+            + (g ^ (e & (f ^ g)))
+            + k_i
+            + w_i
+        )
+        temp2 = (
+            (((a >> 2) | (a << 30)) ^ ((a >> 13) | (a << 19))
+             ^ ((a >> 22) | (a << 10)))
+            + ((a & b) | (c & (a | b)))
+        )
+        h = g
+        g = f
+        f = e
+        e = (d + temp1) & 0xFFFFFFFF
+        d = c
+        c = b
+        b = a
+        a = (temp1 + temp2) & 0xFFFFFFFF
+
+    h0, h1, h2, h3, h4, h5, h6, h7 = hashes
+    return (
+        (h0 + a) & 0xFFFFFFFF,
+        (h1 + b) & 0xFFFFFFFF,
+        (h2 + c) & 0xFFFFFFFF,
+        (h3 + d) & 0xFFFFFFFF,
+        (h4 + e) & 0xFFFFFFFF,
+        (h5 + f) & 0xFFFFFFFF,
+        (h6 + g) & 0xFFFFFFFF,
+        (h7 + h) & 0xFFFFFFFF,
+    )
 
 
 class SHA256:
-    """Class to contain the entire pipeline for SHA1 Hashing Algorithm.
+    """Class to contain the entire pipeline for SHA256 Hashing Algorithm.
+    The object can be fed incrementally with update(),
+    in the same way as the hashlib objects.
     >>> SHA256(b'Python').hash
     '18885f27b5af9012df19e496460f9294d5ab76128824c6f993787004f6d9a7db'
     >>> SHA256(b'hello world').hash
     'b94d27b9934d3e08a52e52d7da7dabfac484efe37a5380ee9088f7ace2efcde9'
     """
 
-    def __init__(self, data: bytes) -> None:
-        self.data = data
-
-        # Initialize hash values
-        self.hashes = [
-            0x6A09E667,
-            0xBB67AE85,
-            0x3C6EF372,
-            0xA54FF53A,
-            0x510E527F,
-            0x9B05688C,
-            0x1F83D9AB,
-            0x5BE0CD19,
-        ]
+    def __init__(self, data: bytes = b"") -> None:
+        self.hashes = INITIAL_HASHES
+        self._buffer = b""
+        self._length = 0
+        self.update(data)
 
-        # Initialize round constants
-        self.round_constants = [
-            0x428A2F98,
-            0x71374491,
-            0xB5C0FBCF,
-            0xE9B5DBA5,
-            0x3956C25B,
-            0x59F111F1,
-            0x923F82A4,
-            0xAB1C5ED5,
-            0xD807AA98,
-            0x12835B01,
-            0x243185BE,
-            0x550C7DC3,
-            0x72BE5D74,
-            0x80DEB1FE,
-            0x9BDC06A7,
-            0xC19BF174,
-            0xE49B69C1,
-            0xEFBE4786,
-            0x0FC19DC6,
-            0x240CA1CC,
-            0x2DE92C6F,
-            0x4A7484AA,
-            0x5CB0A9DC,
-            0x76F988DA,
-            0x983E5152,
-            0xA831C66D,
-            0xB00327C8,
-            0xBF597FC7,
-            0xC6E00BF3,
-            0xD5A79147,
-            0x06CA6351,
-            0x14292967,
-            0x27B70A85,
-            0x2E1B2138,
-            0x4D2C6DFC,
-            0x53380D13,
-            0x650A7354,
-            0x766A0ABB,
-            0x81C2C92E,
-            0x92722C85,
-            0xA2BFE8A1,
-            0xA81A664B,
-            0xC24B8B70,
-            0xC76C51A3,
-            0xD192E819,
-            0xD6990624,
-            0xF40E3585,
-            0x106AA070,
-            0x19A4C116,
-            0x1E376C08,
-            0x2748774C,
-            0x34B0BCB5,
-            0x391C0CB3,
-            0x4ED8AA4A,
-            0x5B9CCA4F,
-            0x682E6FF3,
-            0x748F82EE,
-            0x78A5636F,
-            0x84C87814,
-            0x8CC70208,
-            0x90BEFFFA,
-            0xA4506CEB,
-            0xBEF9A3F7,
-            0xC67178F2,
-        ]
+    @property
+    def hash(self) -> str:
+        """Hex digest of everything passed to the object so far."""
+        return self.hexdigest()
 
-        self.preprocessed_data = self.preprocessing(self.data)
-        self.final_hash()
+    @staticmethod
+    def padding(length: int) -> bytes:
+        """Returns the padding appended to a message of the given byte length.
+        >>> len(SHA256.padding(0)), len(SHA256.padding(55)), len(SHA256.padding(56))
+        (64, 9, 72)
+        """  # noqa: E501
+        padding = b"\x80" + (b"\x00" * (63 - (length + 8) % 64))
+        big_endian_integer = struct.pack(">Q", (length * 8))
+        return padding + big_endian_integer
 
     @staticmethod
     def preprocessing(data: bytes) -> bytes:
-        padding = b"\x80" + (b"\x00" * (63 - (len(data) + 8) % 64))
-        big_endian_integer = struct.pack(">Q", (len(data) * 8))
-        return data + padding + big_endian_integer
-
-    def final_hash(self) -> None:
-        # Convert into blocks of 64 bytes
-        self.blocks = [
-            self.preprocessed_data[x: x + 64]
-            for x in range(0, len(self.preprocessed_data), 64)
-        ]
-
-        for block in self.blocks:
-            # Convert the given block into a list of 4 byte integers
-            words = list(struct.unpack(">16L", block))
-            # add 48 0-ed integers
-            words += [0] * 48
-
-            a, b, c, d, e, f, g, h = self.hashes
-
-            for index in range(0, 64):
-                if index > 15:
-                    # modify the zero-ed indexes at the end of the array
-                    s0 = (
-                        self.ror(words[index - 15], 7)
-                        ^ self.ror(words[index - 15], 18)
-                        ^ (words[index - 15] >> 3)
-                    )
-                    s1 = (
-                        self.ror(words[index - 2], 17)
-                        ^ self.ror(words[index - 2], 19)
-                        ^ (words[index - 2] >> 10)
-                    )
-
-                    words[index] = (
-                        words[index - 16] + s0 + words[index - 7] + s1
-                    ) % 0x100000000
-
-                # Compression
-                s1 = self.ror(e, 6) ^ self.ror(e, 11) ^ self.ror(e, 25)
-                ch = (e & f) ^ ((~e & (0xFFFFFFFF)) & g)
-                temp1 = (
-                    h + s1 + ch + self.round_constants[index] + words[index]
-                ) % 0x100000000
-                s0 = self.ror(a, 2) ^ self.ror(a, 13) ^ self.ror(a, 22)
-                maj = (a & b) ^ (a & c) ^ (b & c)
-                temp2 = (s0 + maj) % 0x100000000
-
-                h, g, f, e, d, c, b, a = (
-                    g,
-                    f,
-                    e,
-                    ((d + temp1) % 0x100000000),
-                    c,
-                    b,
-                    a,
-                    ((temp1 + temp2) % 0x100000000),
-                )
-
-            mutated_hash_values = [a, b, c, d, e, f, g, h]
-
-            # Modify final values
-            self.hashes = [
-                ((element + mutated_hash_values[index]) % 0x100000000)
-                for index, element in enumerate(self.hashes)
-            ]
-
-        self.hash = "".join([hex(value)[2:].zfill(8) for value in self.hashes])
+        """Returns data with its padding appended.
+        >>> len(SHA256.preprocessing(b'abc'))
+        64
+        """
+        return data + SHA256.padding(len(data))
+
+    def update(self, data: bytes) -> None:
+        """Feeds more data into the hash.
+        Only the unprocessed tail (less than one 64 byte block) is kept
+        between calls, so a large input can be hashed piece by piece.
+        >>> hasher = SHA256()
+        >>> hasher.update(b'hello ')
+        >>> hasher.update(b'world')
+        >>> hasher.hexdigest() == SHA256(b'hello world').hexdigest()
+        True
+        """
+        data = memoryview(data).cast("B")
+        self._length += len(data)
+        position = 0
+        if self._buffer:
+            position = 64 - len(self._buffer)
+            self._buffer += data[:position]
+            if len(self._buffer) < 64:
+                return
+            self.compress(self._buffer)
+        end = position + (len(data) - position) // 64 * 64
+        hashes = self.hashes
+        for offset in range(position, end, 64):
+            hashes = compress_block(hashes, data, offset)
+        self.hashes = hashes
+        self._buffer = bytes(data[end:])
+
+    def compress(self, block: bytes) -> None:
+        """Processes a single 64 byte block and updates the hash values."""
+        self.hashes = compress_block(self.hashes, block)
+
+    def copy(self) -> "SHA256":
+        """Returns an independent copy of the current hashing state.
+        >>> hasher = SHA256(b'Py')
+        >>> clone = hasher.copy()
+        >>> clone.update(b'thon')
+        >>> clone.hash == SHA256(b'Python').hash, hasher.hash == SHA256(b'Py').hash
+        (True, True)
+        """  # noqa: E501
+        clone = SHA256.__new__(SHA256)
+        clone.hashes = self.hashes
+        clone._buffer = self._buffer
+        clone._length = self._length
+        return clone
+
+    def digest(self) -> bytes:
+        """Returns the 32 byte digest without changing the hashing state.
+        >>> SHA256(b'').digest().hex()
+        'e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855'
+        """
+        final = self.copy()
+        tail = final._buffer + self.padding(self._length)
+        for offset in range(0, len(tail), 64):
+            final.compress(tail[offset: offset + 64])
+        return struct.pack(">8L", *final.hashes)
+
+    def hexdigest(self) -> str:
+        return self.digest().hex()
+
+    def final_hash(self) -> str:
+        """Returns the hex digest, like SHA1Hash.final_hash; kept for
+        callers of the original one-shot interface.
+        >>> SHA256(b'Python').final_hash() == SHA256(b'Python').hash
+        True
+        """
+        return self.hexdigest()
 
-    def ror(self, value: int, rotations: int) -> int:
+    @staticmethod
+    def ror(value: int, rotations: int) -> int:
         """
         Right rotate a given unsigned number by a certain amount of rotations
         """
         return 0xFFFFFFFF & (value << (32 - rotations)) | (value >> rotations)
 
 
+@lru_cache(maxsize=1024)
+def _padding(length: int) -> bytes:
+    return SHA256.padding(length)
+
+
+def _hexdigest(
+    message: bytes,
+    compress=compress_block,
+    initial: tuple[int, ...] = INITIAL_HASHES,
+) -> str:
+    """Hashes one message without creating a hasher object. SHA1 pads
+    the same way, so sha1_many passes its own compress and initial words.
+    """
+    hashes = initial
+    length = len(message)
+    full = length - length % 64
+    for offset in range(0, full, 64):
+        hashes = compress(hashes, message, offset)
+    tail = message[full:] + _padding(length)
+    for offset in range(0, len(tail), 64):
+        hashes = compress(hashes, tail, offset)
+    return struct.pack(f">{len(hashes)}L", *hashes).hex()
+
+
+_T = TypeVar("_T")
+
+
+def _hash_many(
+    hexdigest: Callable[[bytes], _T], messages: Iterable[bytes],
+    processes: int | None, chunksize: int
+) -> list[_T]:
+    """Maps hexdigest over the messages, in a process pool if
+    processes > 1. Shared by sha256_many, sha1_many and md5_many.
+    """
+    if processes is None or processes <= 1:
+        return [hexdigest(bytes(message)) for message in messages]
+    with ProcessPoolExecutor(processes) as executor:
+        return list(executor.map(hexdigest, map(bytes, messages),
+                                 chunksize=chunksize))
+
+
+def sha256_many(
+    messages: Iterable[bytes], processes: int | None = None,
+    chunksize: int = 512
+) -> list[str]:
+    """Returns the hex digests of many messages, in input order.
+    The constant tables and the padding of every message length seen are
+    shared between messages, so small records cost little more than their
+    compression rounds. With processes > 1 the messages are spread over
+    a process pool in chunks of chunksize.
+    >>> import hashlib
+    >>> msgs = [b'', b'abc', bytes(100), b'x' * 512]
+    >>> sha256_many(msgs) == [hashlib.sha256(m).hexdigest() for m in msgs]
+    True
+    >>> sha256_many(msgs, processes=2) == sha256_many(msgs)
+    True
+    """
+    return _hash_many(_hexdigest, messages, processes, chunksize)
+
+
+def _feed_file(source, update, window: int = FILE_WINDOW) -> None:
+    """Passes the contents of a path or binary file object to update()
+    as memoryviews. Seekable regular files are mapped one window at a
+    time with mmap, so only the current window is resident; pipes,
+    sockets, files that report no size (like those in /proc) and other
+    file objects are read into a single reused buffer. Also used by
+    sha1_file and md5_file.
+    """
+    if isinstance(source, (str, bytes, os.PathLike)):
+        with open(source, "rb") as f:
+            _feed_file(f, update, window)
+        return
+    try:
+        fileno = source.fileno()
+        status = os.fstat(fileno)
+        start = source.tell()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        mappable = False
+    else:
+        # files in /proc and the like are regular but report size 0
+        mappable = stat.S_ISREG(status.st_mode) and status.st_size > 0
+    if not mappable:
+        buffer = bytearray(window)
+        with memoryview(buffer) as view:
+            while size := source.readinto(buffer):
+                with view[:size] as piece:
+                    update(piece)
+        return
+    size = status.st_size
+    while start < size:
+        aligned = start - start % mmap.ALLOCATIONGRANULARITY
+        length = min(window, size - aligned)
+        with mmap.mmap(fileno, length, offset=aligned,
+                       access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view, view[start - aligned:] as piece:
+                update(piece)
+        start = aligned + length
+    source.seek(start)
+
+
+def sha256_file(source) -> str:
+    """Returns the hex digest of a file given by path or binary file object.
+    The file is fed to the compression loop block by block from mmap
+    windows, so memory use stays flat however large the file is.
+    >>> import hashlib, tempfile
+    >>> data = bytes(range(256)) * 300
+    >>> with tempfile.TemporaryFile() as f:
+    ...     _ = f.write(data)
+    ...     _ = f.seek(0)
+    ...     sha256_file(f) == hashlib.sha256(data).hexdigest()
+    True
+    >>> sha256_file(io.BytesIO(data)) == hashlib.sha256(data).hexdigest()
+    True
+    >>> read_end, write_end = os.pipe()
+    >>> _ = os.write(write_end, data[:4096])
+    >>> os.close(write_end)
+    >>> with open(read_end, "rb") as pipe:
+    ...     sha256_file(pipe) == hashlib.sha256(data[:4096]).hexdigest()
+    True
+    """
+    hasher = SHA256()
+    _feed_file(source, hasher.update)
+    return hasher.hexdigest()
+
+
+def _hash_file_range(path: str, offset: int, size: int) -> str:
+    """Hashes size bytes of the file starting at offset."""
+    hasher = SHA256()
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while size > 0 and (piece := f.read(min(1 << 16, size))):
+            hasher.update(piece)
+            size -= len(piece)
+    return hasher.hexdigest()
+
+
+def chunk_digests(
+    path: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    processes: int | None = None,
+    indexes: Iterable[int] | None = None,
+) -> dict[int, str]:
+    """Hashes the fixed-size chunks of a file and maps chunk index to digest.
+    Every worker opens the file and reads only its own chunk, so no chunk
+    data travels between processes. Only the chunks listed in indexes are
+    hashed when it is given. As with sha256_many, the chunks are hashed
+    in this process unless processes > 1.
+    """
+    file_size = os.path.getsize(path)
+    if indexes is None:
+        indexes = range(max(1, -(-file_size // chunk_size)))
+    indexes = sorted(set(indexes))
+    offsets = [index * chunk_size for index in indexes]
+    sizes = [max(0, min(chunk_size, file_size - offset))
+             for offset in offsets]
+    if processes is None or processes <= 1:
+        digests = map(_hash_file_range, [path] * len(indexes), offsets, sizes)
+        return dict(zip(indexes, digests))
+    with ProcessPoolExecutor(processes) as executor:
+        digests = executor.map(_hash_file_range, [path] * len(indexes),
+                               offsets, sizes)
+        return dict(zip(indexes, digests))
+
+
+def merkle_root(digests: list[str]) -> str:
+    """Combines chunk digests pairwise until a single root digest is left.
+    As in RFC 6962, a leaf is the SHA256 of 0x00 and a chunk's raw digest
+    and a node the SHA256 of 0x01 and its two children, so a node can
+    never pass for a leaf; an odd node at the end of a level is carried up
+    unchanged.
+    >>> chunks = [SHA256(piece).digest() for piece in (b'a', b'b', b'c')]
+    >>> a, b, c = (SHA256(b'\\x00' + chunk).digest() for chunk in chunks)
+    >>> ab = SHA256(b'\\x01' + a + b).digest()
+    >>> root = SHA256(b'\\x01' + ab + c).hexdigest()
+    >>> merkle_root([chunk.hex() for chunk in chunks]) == root
+    True
+    >>> merkle_root([chunks[0].hex()]) == a.hex()
+    True
+    """
+    if not digests:
+        return SHA256().hexdigest()
+    level = [SHA256(b"\x00" + bytes.fromhex(digest)).digest()
+             for digest in digests]
+    while len(level) > 1:
+        parents = [
+            SHA256(b"\x01" + level[i] + level[i + 1]).digest()
+            for i in range(0, len(level) - 1, 2)
+        ]
+        if len(level) % 2:
+            parents.append(level[-1])
+        level = parents
+    return level[0].hex()
+
+
+def build_manifest(
+    path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+    processes: int | None = None
+) -> dict:
+    """Returns a JSON-serialisable manifest of the chunk digests of a file
+    together with their Merkle root.
+    """
+    digests = chunk_digests(path, chunk_size, processes)
+    chunks = [digests[index] for index in sorted(digests)]
+    return {
+        "file_size": os.path.getsize(path),
+        "chunk_size": chunk_size,
+        "chunks": chunks,
+        "root": merkle_root(chunks),
+    }
+
+
+def refresh_manifest(
+    path: str,
+    manifest: dict,
+    dirty: Iterable[int] | None = None,
+    processes: int | None = None,
+) -> tuple[dict, list[int]]:
+    """Brings a manifest up to date with the file it describes.
+    Only the chunks listed in dirty are rehashed, plus any chunk that
+    the change of file size moved (the old last chunk and every new one);
+    all chunks are rehashed when dirty is None. Returns the new manifest
+    and the indexes of the chunks whose digest changed.
+    """
+    chunk_size = manifest["chunk_size"]
+    old_chunks = manifest["chunks"]
+    file_size = os.path.getsize(path)
+    count = max(1, -(-file_size // chunk_size))
+    if dirty is None:
+        to_hash = set(range(count))
+    else:
+        to_hash = {index for index in dirty if 0 <= index < count}
+        if file_size != manifest["file_size"]:
+            to_hash.update(range(min(len(old_chunks), count) - 1, count))
+    digests = chunk_digests(path, chunk_size, processes, to_hash)
+    chunks = [digests.get(index) or old_chunks[index]
+              for index in range(count)]
+    changed = [
+        index for index in range(count)
+        if index >= len(old_chunks) or chunks[index] != old_chunks[index]
+    ]
+    new_manifest = {
+        "file_size": file_size,
+        "chunk_size": chunk_size,
+        "chunks": chunks,
+        "root": merkle_root(chunks),
+    }
+    return new_manifest, changed
+
+
+def benchmark(sizes_mb: tuple[int, ...] = (1, 64, 512)) -> dict[int, float]:
+    """Measures the hashing throughput in MB/s for inputs of the given sizes.
+    The input is fed as repeated 1 MB pieces, so the large sizes
+    do not need to be held in memory at once.
+    """
+    piece = bytes(range(256)) * 4096
+    results = {}
+    for size in sizes_mb:
+        hasher = SHA256()
+        start = time.perf_counter()
+        for _ in range(size):
+            hasher.update(piece)
+        hasher.digest()
+        results[size] = size / (time.perf_counter() - start)
+        print(f"{size:>5} MB: {results[size]:.3f} MB/s")
+    return results
+
+
 class SHA256HashTest(unittest.TestCase):
     """Test class for the SHA256 class.
     Inherits the TestCase class from unittest.
@@ -198,6 +529,17 @@ class SHA256HashTest(unittest.TestCase):
         msg = bytes("Test String", "utf-8")
         self.assertEqual(SHA256(msg).hash, hashlib.sha256(msg).hexdigest())
 
+    def test_incremental_update(self) -> None:
+        import hashlib
+
+        msg = bytes(range(256)) * 5
+        for step in (1, 7, 63, 64, 65, 300):
+            hasher = SHA256()
+            for start in range(0, len(msg), step):
+                hasher.update(msg[start: start + step])
+            self.assertEqual(hasher.hexdigest(),
+                             hashlib.sha256(msg).hexdigest())
+
 
 if __name__ == "__main__":
     import doctest
@@ -215,16 +557,74 @@ if __name__ == "__main__":
     parser.add_argument(
         "-f", "--file", dest="input_file", help="Hash contents of a file"
     )
+    parser.add_argument(
+        "-b",
+        "--benchmark",
+        dest="benchmark_sizes",
+        type=int,
+        nargs="*",
+        help="Measure throughput in MB/s for the given sizes in MB "
+        "(1, 64 and 512 MB when no sizes are given)",
+    )
+    parser.add_argument(
+        "-t",
+        "--tree",
+        action="store_true",
+        help="Hash the file in chunks and print the Merkle root",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        dest="chunk_size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help="Chunk size in bytes for --tree",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        help="Worker processes for --tree (serial when not given)",
+    )
+    parser.add_argument(
+        "-m",
+        "--manifest",
+        help="JSON manifest of the chunk hashes for --tree; "
+        "an existing manifest is re-verified and updated",
+    )
+    parser.add_argument(
+        "--dirty",
+        type=int,
+        nargs="+",
+        help="Only rehash these chunk indexes when re-verifying a manifest",
+    )
 
     args = parser.parse_args()
 
     input_string = args.input_string
 
+    if args.benchmark_sizes is not None:
+        benchmark(tuple(args.benchmark_sizes) or (1, 64, 512))
+        raise SystemExit
+
+    if args.tree:
+        if not args.input_file:
+            parser.error("--tree requires --file")
+        if args.manifest and os.path.exists(args.manifest):
+            with open(args.manifest) as f:
+                manifest, changed = refresh_manifest(
+                    args.input_file, json.load(f), args.dirty, args.processes
+                )
+            print(f"changed chunks: {changed}")
+        else:
+            manifest = build_manifest(args.input_file, args.chunk_size,
+                                      args.processes)
+        if args.manifest:
+            with open(args.manifest, "w") as f:
+                json.dump(manifest, f, indent=2)
+        print(manifest["root"])
+        raise SystemExit
+
     # hash input should be a bytestring
     if args.input_file:
-        with open(args.input_file, "rb") as f:
-            hash_input = f.read()
+        print(sha256_file(args.input_file))
     else:
-        hash_input = bytes(input_string, "utf-8")
-
-    print(SHA256(hash_input).hash)
+        print(SHA256(bytes(input_string, "utf-8")).hexdigest())